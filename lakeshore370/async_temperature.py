@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+asyncio version of the temperature/resistance readings in temperature.py
+
+Only the reading commands are implemented here; configuration commands
+(ranges, baud rate, heaters and analog outputs) stay on the synchronous classes.
+
+Requires pyserial-asyncio-fast (pip install pyserial-asyncio-fast);
+the original pyserial-asyncio is used if the fork is not installed
+
+Serial Communication:
+- Port: /dev/ttyUSB1 (default)
+- Baud: 9600, 7-bit data, odd parity, 1 stop bit
+
+"""
+
+import asyncio
+import collections
+try:
+    import serial_asyncio_fast as serial_asyncio
+except ImportError:
+    import serial_asyncio
+from typing import Optional
+from .temperature import (
+    _parse_kelvin, _parse_resistance, _parse_sensor, _parse_power, _parse_status,
+    _parse_scan_fields, _scan_error, _SCAN_COMMANDS, _VALID_CH, _count_queries,
+    _encode_compound, _enable_low_latency,
+)
+
+# How long _drain_stale waits for more leftover input before giving up
+_DRAIN_IDLE = 0.05
+
+class AsyncTemperatureReader:
+    def __init__(self, reader, writer, port="/dev/ttyUSB1", baudrate=9600, timeout=2,
+                 compound=True, max_in_flight=1):
+
+        self.reader = reader
+        self.writer = writer
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        # Send scan queries as one ';'-joined line per input
+        # (set False for firmware that rejects it)
+        self.compound = compound
+        # Why the last read_* call returned None ("NO_RESPONSE", "T_OVER", ... or the raw reply)
+        self.last_error = None
+        # Set when unread input may be left over (timeout, error); drained before the next write
+        self._stale = False
+        # The 370 answers one command at a time, so only one query may be on the wire
+        self._lock = asyncio.Lock()
+        # With max_in_flight > 1 queries are written without waiting for the replies before them
+        # (up to max_in_flight at once) and _reply_reader hands the replies out in write order.
+        # Only use it with firmware that answers every query, or later replies get out of step.
+        # _pending holds [future, replies expected, replies so far] per line in flight
+        self._slots = asyncio.Semaphore(max_in_flight) if max_in_flight > 1 else None
+        self._pending = collections.deque()
+        self._reply_task = None
+
+    @classmethod
+    async def open(cls, port="/dev/ttyUSB1", baudrate=9600, timeout=2, compound=True,
+                   max_in_flight=1, low_latency=True):
+        """Open the serial port and return a connected reader"""
+        try:
+            reader, writer = await serial_asyncio.open_serial_connection(
+                url=port,
+                baudrate=baudrate,
+                bytesize=7,        # 7 data bits
+                parity='O',        # Odd parity
+                stopbits=1
+            )
+            if low_latency:
+                # Same latency timer and low_latency flag as TemperatureReader
+                _enable_low_latency(writer.transport.serial, port)
+            print(f"Connected to Lakeshore 370 on {port} at {baudrate} baud")
+        except Exception as e:
+            print(f"Failed to connect to Lakeshore 370: {e}")
+            raise
+        return cls(reader, writer, port=port, baudrate=baudrate, timeout=timeout,
+                   compound=compound, max_in_flight=max_in_flight)
+
+    # Use for sending direct serial commands
+    async def send_command(self, command):
+        if self._slots is not None:
+            return await self._send_pipelined(command)
+
+        async with self._lock:
+            return await self._exchange((command + '\r\n').encode('ascii'))
+
+    # Write one encoded line and read its reply; call with _lock held. A compound line's
+    # replies are all read and returned ';'-joined (as TemperatureReader._exchange)
+    async def _exchange(self, data, expected=None):
+        if expected is None:
+            expected = _count_queries(data) if b';' in data else 1
+        try:
+            if self._stale:
+                await self._drain_stale()
+            self.writer.write(data)
+            await self.writer.drain()
+            response = await self._read_line()
+            if response is None or expected < 2:
+                return response
+
+            # Some firmware answers each query on its own line instead of one ';' line
+            parts = [response]
+            count = response.count(';') + 1
+            while count < expected:
+                more = await self._read_line()
+                if more is None:
+                    # Whatever else this line brings back must not be read as the next reply
+                    self._stale = True
+                    break
+                parts.append(more)
+                count += more.count(';') + 1
+            return ";".join(parts)
+        except Exception as e:
+            self._stale = True
+            print(f"Communication error: {e}")
+            return None
+
+    # One reply line, stripped (None on timeout or a blank line)
+    async def _read_line(self):
+        try:
+            response = await asyncio.wait_for(self.reader.readuntil(b'\r\n'), self.timeout)
+        except asyncio.TimeoutError:
+            # Timed out, the rest of this reply may still turn up
+            self._stale = True
+            return None
+
+        decoded = response.decode('ascii', errors='ignore').strip()
+        return decoded if decoded else None
+
+    # Send several queries as one ';'-joined line and return one reply per query,
+    # or None if the device did not answer every query (as TemperatureReader.send_compound)
+    async def send_compound(self, cmds):
+        line, expected = _encode_compound(tuple(cmds))
+        if self._slots is not None:
+            # _reply_reader collects the replies to every query, on one line or several
+            response = await self._send_pipelined(";".join(cmds))
+            replies = [reply.strip() for reply in response.split(';')] if response else []
+            return replies if len(replies) == expected else None
+
+        async with self._lock:
+            response = await self._exchange(line, expected)
+        if response is None:
+            return None
+
+        replies = [reply.strip() for reply in response.split(';')]
+        return replies if len(replies) == expected else None
+
+    # Throw away input left over from a timed out or short exchange, so the next
+    # query doesn't take it as its reply (same job as TemperatureReader._drain_stale)
+    async def _drain_stale(self):
+        self._stale = False
+        try:
+            while await asyncio.wait_for(self.reader.read(4096), _DRAIN_IDLE):
+                pass
+        except asyncio.TimeoutError:
+            pass  # Nothing more arrived
+
+    async def _send_pipelined(self, command):
+        data = (command + '\r\n').encode('ascii')
+        expected = _count_queries(data)
+        if not expected:
+            # Settings have no reply, so nothing to queue for
+            async with self._lock:
+                self.writer.write(data)
+                await self.writer.drain()
+            return None
+
+        async with self._slots:
+            reply = asyncio.get_running_loop().create_future()
+            try:
+                # Queue position and write order must match, so both happen under the lock
+                async with self._lock:
+                    self._pending.append([reply, expected, []])
+                    self.writer.write(data)
+                    await self.writer.drain()
+                if self._reply_task is None:
+                    self._reply_task = asyncio.ensure_future(self._reply_reader())
+
+                # shield: a reply that times out keeps its place so later replies still line up
+                response = await asyncio.wait_for(asyncio.shield(reply), self.timeout)
+            except asyncio.TimeoutError:
+                return None
+            except Exception as e:
+                print(f"Communication error: {e}")
+                return None
+
+        return response if response else None
+
+    # Background task for max_in_flight > 1: reply lines go to the oldest line in flight until it
+    # has one reply per query (a compound line may be answered on one ';' line or one line per
+    # query), which then gets them back ';'-joined
+    async def _reply_reader(self):
+        try:
+            while True:
+                line = await self.reader.readuntil(b'\r\n')
+                if not self._pending:
+                    continue
+                entry = self._pending[0]
+                entry[2].extend(reply.strip() for reply in line.decode('ascii', errors='ignore').split(';'))
+                if len(entry[2]) >= entry[1]:
+                    self._pending.popleft()
+                    entry[0].set_result(";".join(entry[2]).strip())
+        except Exception as e:
+            while self._pending:
+                self._pending.popleft()[0].set_exception(e)
+        finally:
+            self._reply_task = None
+
+    # Send "<query> <input>" and parse the reply; error replies come back as code strings
+    async def _read(self, query, input_channel, parse):
+        if type(input_channel) is not int or input_channel not in _VALID_CH:
+            raise ValueError("Input channel must be an integer between 1 and 16")
+
+        return parse(await self.send_command(f"{query} {input_channel}"))
+
+    # Numeric readings pass through; anything else is kept in last_error and None is returned
+    def _checked(self, value):
+        if isinstance(value, str):
+            self.last_error = value
+            return None
+        self.last_error = None
+        return value
+
+    async def read_kelvin_temperature(self, input_channel: int) -> Optional[float]:
+        return self._checked(await self._read("RDGK?", input_channel, _parse_kelvin))
+
+    async def read_resistance(self, input_channel: int) -> Optional[float]:
+        return self._checked(await self._read("RDGR?", input_channel, _parse_resistance))
+
+    async def read_sensor(self, input_channel: int) -> Optional[float]:
+        return self._checked(await self._read("RDGS?", input_channel, _parse_sensor))
+
+    async def read_excitation_power(self, input_channel: int) -> Optional[float]:
+        return self._checked(await self._read("RDGPWR?", input_channel, _parse_power))
+
+    async def read_status(self, input_channel: int) -> Optional[int]:
+        return self._checked(await self._read("RDGST?", input_channel, _parse_status))
+
+    async def _read_input(self, input_ch):
+        try:
+            if type(input_ch) is not int or input_ch not in _VALID_CH:
+                raise ValueError("Input channel must be an integer between 1 and 16")
+
+            # One compound query per input, same as TemperatureReader.scan_inputs
+            fields = None
+            if self.compound:
+                fields = await self.send_compound(_SCAN_COMMANDS[input_ch])
+            if fields is None:
+                # compound=False, or firmware did not answer the compound query: read one by one
+                return {
+                    'temperature': await self._read("RDGK?", input_ch, _parse_kelvin),
+                    'resistance': await self._read("RDGR?", input_ch, _parse_resistance),
+                    'sensor': await self._read("RDGS?", input_ch, _parse_sensor),
+                    'power': await self._read("RDGPWR?", input_ch, _parse_power),
+                    'status': await self._read("RDGST?", input_ch, _parse_status)
+                }
+
+            return _parse_scan_fields(fields)
+        except Exception as e:
+            return _scan_error(e)
+
+    async def scan_inputs(self, input_list=None):
+        if input_list is None:
+            input_list = [1, 2, 3, 4]  # Default inputs to scan
+
+        # Queries still go out one at a time (see _lock), but parsing of one
+        # reply overlaps with the next command on the wire
+        readings = await asyncio.gather(*(self._read_input(input_ch) for input_ch in input_list))
+        return dict(zip(input_list, readings))
+
+    async def close(self):
+        """Close serial connection"""
+        if self._reply_task is not None:
+            self._reply_task.cancel()
+        if not self.writer.is_closing():
+            self.writer.close()
+            print("Lakeshore 370 connection closed")
+
+    async def __aenter__(self):
+        """Async context manager entry"""
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Async context manager exit"""
+        await self.close()
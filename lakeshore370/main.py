@@ -6,11 +6,639 @@ Original serial commands located in temperature.py and outputs.py
 """
 
 import argparse
-import serial
-from .temperature import TemperatureReader
-from .outputs import OutputController
+import bisect
+import contextlib
+import csv
+import functools
+import json
+import re
+import sys
+from types import MappingProxyType
+
+# serial, asyncio and the driver modules are imported inside main() once the
+# arguments have parsed, so --help and usage errors don't pay for them
+
+# Read-only lookup tables for printing device codes
+_BAUD_MAP = MappingProxyType({"0": "300", "1": "1200", "2": "9600"})
+_HEATER_RANGE_NAMES = MappingProxyType({
+    0: "Off", 1: "31.6 µA (0.1 µW)", 2: "100 µA (1 µW)", 3: "316 µA (10 µW)",
+    4: "1 mA (100µW)", 5: "3.16 mA (1 mW)", 6: "10 mA (10 mW)",
+    7: "31.6 mA (100 mW)", 8: "100 mA (1 W)"
+})
+_ANALOG_MODE_NAMES = MappingProxyType({0: "Off", 1: "Channel", 2: "Manual", 3: "Zone", 4: "Still"})
+_POLARITY_NAMES = MappingProxyType({0: "Unipolar", 1: "Bipolar"})
+_SOURCE_NAMES = MappingProxyType({1: "Kelvin", 2: "Ohms", 3: "Linear Data"})
+
+# --scan output per input: all readings numeric, or preformatted strings
+_SCAN_DETAIL_TMPL_NUM = (
+    "Input {ch}:\n"
+    "  Temperature: {temp:.3f} K\n"
+    "  Resistance:  {res:.4f} Ω\n"
+    "  Sensor:      {sen:.6f}\n"
+    "  Power:       {pwr}\n"
+    "  Status:      {st}\n"
+    "\n"
+)
+_SCAN_DETAIL_TMPL_STR = (
+    "Input {ch}:\n"
+    "  Temperature: {temp}\n"
+    "  Resistance:  {res}\n"
+    "  Sensor:      {sen}\n"
+    "  Power:       {pwr}\n"
+    "  Status:      {st}\n"
+    "\n"
+)
+
+# --set-range CONFIG: <mode>,<excitation>,<range>,<autorange>,<cs_off>
+_RANGE_RE = re.compile(r'^(\d+),(\d+),(\d+),(\d+),(\d+)$')
+
+# --analog-config values joined with commas: <channel>,<polarity>,<mode> then the
+# mode-specific values; anything after those is ignored
+_NUM = r'([+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)'
+_ANALOG_HEAD_RE = re.compile(r'(\d+),(\d+),(\d+)(?:,|$)')
+_ANALOG_RES = {
+    0: _ANALOG_HEAD_RE,  # Off
+    1: re.compile(rf'\d+,\d+,\d+,(\d+),(\d+),{_NUM},{_NUM}(?:,|$)'),  # Channel
+    2: re.compile(rf'\d+,\d+,\d+,{_NUM}(?:,|$)'),  # Manual
+    3: _ANALOG_HEAD_RE,  # Zone
+    4: _ANALOG_HEAD_RE,  # Still
+}
+_ANALOG_MODE_USAGE = {
+    1: "channel mode requires: <channel> <polarity> <mode> <input_channel> <data_source> <high_value> <low_value>",
+    2: "manual mode requires: <channel> <polarity> <mode> <manual_value>",
+}
+
+# Unit thresholds for format_power(): values below _POWER_KEYS[i] use _POWER_FMT[i]
+_POWER_KEYS = (1e-12, 1e-9, 1e-6, 1e-3)
+_POWER_FMT = (('fW', 1e15), ('pW', 1e12), ('nW', 1e9), ('µW', 1e6), ('mW', 1e3))
+
+def format_power(p, width=None, prec=3):
+    """Format an excitation power in watts with the largest unit that keeps it >= 1"""
+    unit, scale = _POWER_FMT[bisect.bisect_right(_POWER_KEYS, p)]
+    if width is None:
+        return f"{p*scale:.{prec}f} {unit}"
+    return f"{p*scale:{width}.{prec}f} {unit}"
+
+def _table_scan_inputs(args):
+    """Input list for --scan-range/--all, printing the scan header"""
+    if args.scan_range:
+        start, stop = args.scan_range
+        input_list = list(range(start, stop + 1))
+        print(f"Commands: RDGK?, RDGR?, RDGPWR?, RDGST? for inputs {start}-{stop}")
+        print(f"Scanning input range {start} to {stop}:")
+    else:  # args.all
+        input_list = [1, 2]  # Model 370 has only 2 inputs
+        print("Commands: RDGK?, RDGR?, RDGPWR? for inputs 1-2")
+        print("Reading all inputs (1-2):")
+    return input_list
+
+def _detail_scan_inputs(args):
+    """Input list for --scan, printing the scan header (None if the inputs are invalid)"""
+    if len(args.scan) == 0:
+        input_list = [1, 2]  # Default scan inputs 1-2 (Model 370 has only 2 inputs)
+    else:
+        try:
+            input_list = [int(x) for x in args.scan]
+        except ValueError:
+            print("Error: Invalid input numbers for --scan")
+            return None
+
+    print(f"Commands: RDGK?, RDGR?, RDGS?, RDGPWR?, RDGST? for inputs {input_list}")
+    print(f"Scanning inputs: {input_list}")
+    return input_list
+
+def _print_scan_table(results, show_status):
+    """One line per input for --scan-range/--all"""
+    for input_ch, data in results.items():
+        temp = data['temperature']
+        resistance = data['resistance']
+        power = data['power']
+        status = data.get('status')  # status might not be in 'all' mode
+        
+        # Only print inputs that have valid data
+        if temp == "NO_RESPONSE" and resistance == "NO_RESPONSE":
+            continue
+
+        # Build the whole row and write it once
+        parts = [f"Input {input_ch:2d}:"]
+
+        # Temperature formatting
+        if isinstance(temp, (int, float)):
+            parts.append(f" Temp: {temp:8.3f} K")
+        else:
+            parts.append(f" Temp: {temp:>12s}")
+            
+        # Resistance formatting  
+        if isinstance(resistance, (int, float)):
+            parts.append(f" | Res: {resistance:10.4f} Ω")
+        else:
+            parts.append(f" | Res: {resistance:>12s}")
+            
+        # Power formatting
+        if isinstance(power, (int, float)):
+            parts.append(f" | Pwr: {format_power(power, width=8, prec=1)}")
+        else:
+            parts.append(f" | Pwr: {power:>10s}")
+
+        # Status formatting (only for scan_range)
+        if show_status and status is not None:
+            if isinstance(status, int):
+                parts.append(f" | St: 0x{status:02X}")
+            else:
+                parts.append(f" | St: {status:>6s}")
+
+        parts.append("\n")
+        sys.stdout.write("".join(parts))
+
+# Columns for --format csv/tsv
+_SCAN_FIELDS = ('temperature', 'resistance', 'sensor', 'power', 'status')
+
+def _write_scan_results(results, fmt, out):
+    """Write scan results as json, csv or tsv in one go (no unit formatting)"""
+    if fmt == 'json':
+        out.write(json.dumps(results, separators=(',', ':'), default=str) + "\n")
+        return
+
+    writer = csv.writer(out, delimiter=',' if fmt == 'csv' else '\t', lineterminator="\n")
+    writer.writerow(('input',) + _SCAN_FIELDS)
+    writer.writerows([input_ch] + [data.get(field) for field in _SCAN_FIELDS] for input_ch, data in results.items())
+
+def _write_port_scan_results(results_by_port, fmt, out):
+    """--ports version of _write_scan_results(): json keyed by port, csv/tsv with a port column"""
+    if fmt == 'json':
+        out.write(json.dumps(results_by_port, separators=(',', ':'), default=str) + "\n")
+        return
+
+    writer = csv.writer(out, delimiter=',' if fmt == 'csv' else '\t', lineterminator="\n")
+    writer.writerow(('port', 'input') + _SCAN_FIELDS)
+    writer.writerows(
+        [port, input_ch] + [data.get(field) for field in _SCAN_FIELDS]
+        for port, results in results_by_port.items()
+        for input_ch, data in results.items()
+    )
+
+def _format_reading(value, spec, suffix=""):
+    """Format a numeric reading with spec, or pass an error code string through"""
+    if isinstance(value, (int, float)):
+        return f"{value:{spec}}{suffix}"
+    return str(value)
+
+def _print_scan_details(results):
+    """Block of readings per input for --scan"""
+    for input_ch, data in results.items():
+        temp = data['temperature']
+        resistance = data['resistance']
+        sensor = data['sensor']
+        power = data['power']
+        status = data['status']
+
+        row = {
+            'ch': input_ch,
+            'pwr': format_power(power) if isinstance(power, (int, float)) else power,
+            'st': f"{status} (0x{status:02X})" if isinstance(status, int) else status,
+        }
+        if all(isinstance(v, (int, float)) for v in (temp, resistance, sensor)):
+            template = _SCAN_DETAIL_TMPL_NUM
+            row.update(temp=temp, res=resistance, sen=sensor)
+        else:
+            template = _SCAN_DETAIL_TMPL_STR
+            row.update(
+                temp=_format_reading(temp, ".3f", " K"),
+                res=_format_reading(resistance, ".4f", " Ω"),
+                sen=_format_reading(sensor, ".6f"),
+            )
+        sys.stdout.write(template.format_map(row))
+
+# Raw command
+def _handle_raw_command(args, temp_reader, get_output_ctrl):
+    """--raw-command"""
+    print(f"Command: {args.raw_command}")
+    response = temp_reader.send_command(args.raw_command)
+    print(f"Response: {response}")
+
+# Device information
+def _handle_info(args, temp_reader, get_output_ctrl):
+    """--info"""
+    print("Device Information:")
+    print("Command: *IDN?")
+    identification = temp_reader.get_identification()
+    print("Command: BAUD?")
+    baud_rate = temp_reader.get_baud_rate()
+    print(f"  ID: {identification}")
+    print(f"  Baud Rate Code: {baud_rate} (0=300, 1=1200, 2=9600)")
+    print()
+
+# Baud rate operations
+def _handle_get_baud(args, temp_reader, get_output_ctrl):
+    """--get-baud"""
+    print("Command: BAUD?")
+    baud_code = temp_reader.get_baud_rate()
+    baud_str = _BAUD_MAP.get(baud_code, f"Unknown ({baud_code})")
+    print(f"Current baud rate: {baud_str} baud (code: {baud_code})")
+
+def _handle_set_baud(args, temp_reader, get_output_ctrl):
+    """--set-baud"""
+    print(f"Command: BAUD {args.set_baud}")
+    print(f"Setting baud rate to code {args.set_baud}...")
+    temp_reader.set_baud_rate(args.set_baud)
+    print("Note: You may need to reconnect with the new baud rate")
+
+# Single input readings
+def _handle_read_temp(args, temp_reader, get_output_ctrl):
+    """--read-temp"""
+    print(f"Command: RDGK? {args.read_temp}")
+    temp = temp_reader.read_kelvin_temperature(args.read_temp)
+    if temp is not None:
+        print(f"Input {args.read_temp} Temperature: {temp:.3f} K")
+    else:
+        print(f"Input {args.read_temp} Temperature: {temp_reader.last_error or 'NO_RESPONSE'}")
+
+def _handle_read_resistance(args, temp_reader, get_output_ctrl):
+    """--read-resistance"""
+    print(f"Command: RDGR? {args.read_resistance}")
+    resistance = temp_reader.read_resistance(args.read_resistance)
+    if resistance is not None:
+        print(f"Input {args.read_resistance} Resistance: {resistance:.4f} Ω")
+    else:
+        print(f"Input {args.read_resistance} Resistance: {temp_reader.last_error or 'NO_RESPONSE'}")
+
+def _handle_read_sensor(args, temp_reader, get_output_ctrl):
+    """--read-sensor"""
+    print(f"Command: RDGS? {args.read_sensor}")
+    sensor = temp_reader.read_sensor(args.read_sensor)
+    if sensor is not None:
+        print(f"Input {args.read_sensor} Sensor: {sensor:.6f}")
+    else:
+        print(f"Input {args.read_sensor} Sensor: {temp_reader.last_error or 'NO_RESPONSE'}")
+
+def _handle_read_power(args, temp_reader, get_output_ctrl):
+    """--read-power"""
+    print(f"Command: RDGPWR? {args.read_power}")
+    power = temp_reader.read_excitation_power(args.read_power)
+    if power is not None:
+        print(f"Input {args.read_power} Power: {format_power(power)}")
+    else:
+        print(f"Input {args.read_power} Power: {temp_reader.last_error or 'NO_RESPONSE'}")
+
+def _handle_read_status(args, temp_reader, get_output_ctrl):
+    """--read-status"""
+    print(f"Command: RDGST? {args.read_status}")
+    status = temp_reader.read_status(args.read_status)
+    if status is not None:
+        print(f"Input {args.read_status} Status: {status} (0x{status:02X})")
+    else:
+        print(f"Input {args.read_status} Status: {temp_reader.last_error or 'NO_RESPONSE'}")
+
+# Range operations
+def _handle_get_range(args, temp_reader, get_output_ctrl):
+    """--get-range"""
+    print(f"Command: RDGRNG? {args.get_range}")
+    range_config = temp_reader.get_resistance_range(args.get_range)
+    print(f"Input {args.get_range} Resistance Range Configuration:")
+    if isinstance(range_config, dict):
+        print(f"  Format: <mode>,<excitation>,<range>,<autorange>,<cs_off>")
+        print(f"  Response: {range_config['mode']},{range_config['excitation']},{range_config['range']},{range_config['autorange']},{range_config['cs_off']}")
+        print(f"  Parsed:")
+        print(f"    Mode: {range_config['mode']} (0=manual, 1=current, 2=voltage)")
+        print(f"    Excitation: {range_config['excitation']} (level 1-22)")
+        print(f"    Range: {range_config['range']} (range 1-22)")
+        print(f"    Autorange: {range_config['autorange']} (0=off, 1=on)")
+        print(f"    Current Source: {range_config['cs_off']} (0=on, 1=off)")
+    else:
+        print(f"  Format: <mode>,<excitation>,<range>,<autorange>,<cs_off>")
+        print(f"  Response: {range_config}")
+
+def _handle_set_range(args, temp_reader, get_output_ctrl):
+    """--set-range (validated by _RangeConfigAction)"""
+    input_num, (mode, excitation, range_code, autorange, cs_off) = args.set_range
+    print(f"Command: RDGRNG {input_num},{mode},{excitation},{range_code},{autorange},{cs_off}")
+
+    try:
+        success = temp_reader.set_resistance_range(input_num, mode, excitation, range_code, autorange, cs_off)
+    except ValueError as e:
+        print(f"Error parsing configuration: {e}")
+        print("Configuration format: <mode>,<excitation>,<range>,<autorange>,<cs_off>")
+        print("Example: --set-range 1 1,10,22,1,0")
+        return
+
+    if success:
+        print(f"Command sent successfully for input {input_num}")
+        print(f"  Mode: {mode} (0=manual, 1=current, 2=voltage)")
+        print(f"  Excitation: {excitation} (level 1-22)")
+        print(f"  Range: {range_code} (range 1-22)")
+        print(f"  Autorange: {autorange} (0=off, 1=on)")
+        print(f"  Current Source: {cs_off} (0=on, 1=off)")
+        print()
+        print(f"Verify the setting with: lakeshore370 --get-range {input_num}")
+    else:
+        print(f"Failed to send command for input {input_num}")
+
+# Heater control
+def _handle_heater_output(args, temp_reader, get_output_ctrl):
+    """--heater-output"""
+    output_ctrl = get_output_ctrl()
+    print(f"Command: MOUT {args.heater_output:.3f}")
+    success = output_ctrl.set_heater_output(args.heater_output)
+    if success:
+        print(f"Heater output set to {args.heater_output:.3f}%")
+    else:
+        print("Failed to set heater output")
+
+def _handle_get_heater_output(args, temp_reader, get_output_ctrl):
+    """--get-heater-output"""
+    output_ctrl = get_output_ctrl()
+    print("Command: HTR?")
+    output = output_ctrl.get_heater_output()
+    if isinstance(output, (int, float)):
+        print(f"Current heater output: {output:.3f}%")
+    else:
+        print(f"Heater output: {output}")
+
+def _handle_heater_range(args, temp_reader, get_output_ctrl):
+    """--heater-range"""
+    output_ctrl = get_output_ctrl()
+    print(f"Command: HTRRNG {args.heater_range}")
+    success = output_ctrl.set_heater_range(args.heater_range)
+    if not success:
+        print("Failed to set heater range")
+
+def _handle_get_heater_range(args, temp_reader, get_output_ctrl):
+    """--get-heater-range"""
+    output_ctrl = get_output_ctrl()
+    print("Command: HTRRNG?")
+    range_code = output_ctrl.get_heater_range()
+    if isinstance(range_code, int):
+        print(f"Current heater range: {range_code} - {_HEATER_RANGE_NAMES.get(range_code, 'Unknown')}")
+    else:
+        print(f"Heater range: {range_code}")
+
+def _handle_get_heater_status(args, temp_reader, get_output_ctrl):
+    """--get-heater-status"""
+    output_ctrl = get_output_ctrl()
+    print("Command: HTRST?")
+    status = output_ctrl.get_heater_status()
+    if isinstance(status, int):
+        print(f"Heater status: {status} (0x{status:02X})")
+    else:
+        print(f"Heater status: {status}")
+
+# Analog output operations
+def _handle_analog_config(args, temp_reader, get_output_ctrl):
+    """--analog-config (validated by _AnalogConfigAction)"""
+    output_ctrl = get_output_ctrl()
+    config = args.analog_config
+    channel, polarity, mode = config['channel'], config['polarity'], config['mode']
+    if mode == 1:  # Channel
+        print(f"Command: ANALOG {channel},{polarity},{mode},{config['input_channel']},{config['data_source']},{config['high_value']},{config['low_value']},0")
+    elif mode == 2:  # Manual
+        print(f"Command: ANALOG {channel},{polarity},{mode},0,0,0,0,{config['manual_value']}")
+    else:  # Off, Zone, Still (channel 2 only)
+        print(f"Command: ANALOG {channel},{polarity},{mode},0,0,0,0,0")
+
+    try:
+        success = output_ctrl.set_analog_output(**config)
+    except ValueError as e:
+        print(f"Error in analog configuration: {e}")
+        print("Usage: --analog-config <channel> <polarity> <mode> [additional args based on mode]")
+        return
+
+    if success:
+        print(f"Analog output {channel} configuration set successfully")
+    else:
+        print(f"Failed to set analog output {channel} configuration")
+
+def _handle_get_analog_config(args, temp_reader, get_output_ctrl):
+    """--get-analog-config"""
+    output_ctrl = get_output_ctrl()
+    print(f"Command: ANALOG? {args.get_analog_config}")
+    config = output_ctrl.get_analog_output_config(args.get_analog_config)
+    if isinstance(config, dict):
+        print(f"Analog output {args.get_analog_config} configuration:")
+        print(f"  Polarity: {config['polarity']} ({_POLARITY_NAMES.get(config['polarity'], 'Unknown')})")
+        print(f"  Mode: {config['mode']} ({_ANALOG_MODE_NAMES.get(config['mode'], 'Unknown')})")
+        print(f"  Channel: {config['channel']}")
+        print(f"  Data Source: {config['data_source']} ({_SOURCE_NAMES.get(config['data_source'], 'Unknown')})")
+        print(f"  High Value: {config['high_value']}")
+        print(f"  Low Value: {config['low_value']}")
+        print(f"  Manual Value: {config['manual_value']}")
+    else:
+        print(f"Analog output {args.get_analog_config} configuration: {config}")
+
+def _handle_get_analog_output(args, temp_reader, get_output_ctrl):
+    """--get-analog-output"""
+    output_ctrl = get_output_ctrl()
+    print(f"Command: AOUT? {args.get_analog_output}")
+    output = output_ctrl.get_analog_output_value(args.get_analog_output)
+    if isinstance(output, (int, float)):
+        print(f"Analog output {args.get_analog_output} current value: {output:.3f}%")
+    else:
+        print(f"Analog output {args.get_analog_output} value: {output}")
+
+# Range scanning and all inputs
+def _handle_scan_range(args, temp_reader, get_output_ctrl):
+    """--scan-range and --all"""
+    input_list = _table_scan_inputs(args)
+    results = temp_reader.scan_inputs(input_list)
+    if args.format == 'pretty':
+        _print_scan_table(results, show_status=bool(args.scan_range))
+    else:
+        _write_scan_results(results, args.format, args.data_out)
+
+def _handle_all(args, temp_reader, get_output_ctrl):
+    """--all (--scan-range takes precedence when both are given)"""
+    if args.scan_range is None:
+        _handle_scan_range(args, temp_reader, get_output_ctrl)
+
+# Multiple input scanning (detailed view)
+def _handle_scan(args, temp_reader, get_output_ctrl):
+    """--scan"""
+    input_list = _detail_scan_inputs(args)
+    if input_list is None:
+        return
+    results = temp_reader.scan_inputs(input_list)
+    if args.format == 'pretty':
+        _print_scan_details(results)
+    else:
+        _write_scan_results(results, args.format, args.data_out)
+
+# Handlers run in this order for every option the user supplied
+HANDLERS = {
+    'info': _handle_info,
+    'get_baud': _handle_get_baud,
+    'set_baud': _handle_set_baud,
+    'read_temp': _handle_read_temp,
+    'read_resistance': _handle_read_resistance,
+    'read_sensor': _handle_read_sensor,
+    'read_power': _handle_read_power,
+    'read_status': _handle_read_status,
+    'get_range': _handle_get_range,
+    'set_range': _handle_set_range,
+    'heater_output': _handle_heater_output,
+    'get_heater_output': _handle_get_heater_output,
+    'heater_range': _handle_heater_range,
+    'get_heater_range': _handle_get_heater_range,
+    'get_heater_status': _handle_get_heater_status,
+    'analog_config': _handle_analog_config,
+    'get_analog_config': _handle_get_analog_config,
+    'get_analog_output': _handle_get_analog_output,
+    'scan_range': _handle_scan_range,
+    'all': _handle_all,
+    'scan': _handle_scan,
+}
+
+# The operations --async and --ports can run
+_SCAN_OPTIONS = ('scan_range', 'all', 'scan')
+
+def _unset(value):
+    # Identity tests: 0 == False, so `in (None, False)` would treat --heater-output 0 as unset
+    return value is None or value is False
+
+def _check_scan_only(args):
+    """--async/--ports only run scans: reject anything they would silently skip"""
+    modes = [flag for flag, used in (("--async", args.use_async), ("--ports", args.ports)) if used]
+    if not modes:
+        return
+    if len(modes) > 1:
+        PARSER.error("--async and --ports can't be combined")
+
+    others = [name for name in HANDLERS if name not in _SCAN_OPTIONS and not _unset(getattr(args, name))]
+    if args.raw_command is not None:
+        others.append('raw_command')
+    if others:
+        PARSER.error(f"{modes[0]} only runs --scan, --scan-range and --all, not --{others[0].replace('_', '-')}")
+    if all(_unset(getattr(args, name)) for name in _SCAN_OPTIONS):
+        PARSER.error(f"{modes[0]} needs --scan, --scan-range or --all")
+
+async def amain(args):
+    """asyncio counterpart of main() for the scan operations (--scan, --scan-range, --all)"""
+    # Imported here so pyserial-asyncio-fast is only needed with --async
+    from .async_temperature import AsyncTemperatureReader
+
+    async with await AsyncTemperatureReader.open(port=args.port, baudrate=args.baudrate, compound=not args.no_batch, low_latency=not args.no_lowlat) as temp_reader:
+        if args.scan_range is not None or args.all:
+            input_list = _table_scan_inputs(args)
+            results = await temp_reader.scan_inputs(input_list)
+            if args.format == 'pretty':
+                _print_scan_table(results, show_status=bool(args.scan_range))
+            else:
+                _write_scan_results(results, args.format, args.data_out)
+
+        if args.scan is not None:
+            input_list = _detail_scan_inputs(args)
+            if input_list is None:
+                return
+            results = await temp_reader.scan_inputs(input_list)
+            if args.format == 'pretty':
+                _print_scan_details(results)
+            else:
+                _write_scan_results(results, args.format, args.data_out)
+
+def _print_serial_error(e, port):
+    print(f"Serial connection error: {e}")
+    print(f"Make sure the Lakeshore 370 is connected to {port} and the port is correct.")
+
+def _run_ports(args, stack):
+    """--ports: the scan operations (--scan, --scan-range, --all) on every bridge at once"""
+    from .temperature import TemperatureReader
+    from .multi import scan_many
+
+    import serial
+
+    readers = []
+    for port in args.ports:
+        try:
+            readers.append(stack.enter_context(TemperatureReader(port=port, baudrate=args.baudrate, compound=not args.no_batch, low_latency=not args.no_lowlat)))
+        except serial.SerialException as e:
+            # Named here: past this point main() can't tell which port failed
+            _print_serial_error(e, port)
+            return
+
+    scans = []
+    if args.scan_range is not None or args.all:
+        scans.append((_table_scan_inputs(args), lambda results: _print_scan_table(results, show_status=bool(args.scan_range))))
+    if args.scan is not None:
+        input_list = _detail_scan_inputs(args)
+        if input_list is not None:
+            scans.append((input_list, _print_scan_details))
+
+    for input_list, print_results in scans:
+        results_by_port = scan_many(readers, input_list)
+        if args.format != 'pretty':
+            _write_port_scan_results(results_by_port, args.format, args.data_out)
+            continue
+        for port, results in results_by_port.items():
+            print(f"=== {port} ===")
+            print_results(results)
+
+def _parse_ports(value):
+    """--ports /dev/ttyUSB4,/dev/ttyUSB5 -> list of ports"""
+    ports = [port.strip() for port in value.split(",") if port.strip()]
+    if not ports:
+        raise argparse.ArgumentTypeError("expected a comma-separated list of serial ports")
+    # Results are keyed by port, so a repeated port would scan one bridge twice and lose a result
+    duplicates = sorted({port for port in ports if ports.count(port) > 1})
+    if duplicates:
+        raise argparse.ArgumentTypeError(f"port listed more than once: {', '.join(duplicates)}")
+    return ports
+
+def _parse_range_config(config_str):
+    """<mode>,<excitation>,<range>,<autorange>,<cs_off> -> tuple of ints"""
+    m = _RANGE_RE.match(config_str)
+    if not m:
+        raise argparse.ArgumentTypeError(
+            "configuration must have exactly 5 comma-separated values: "
+            "<mode>,<excitation>,<range>,<autorange>,<cs_off> (e.g. 1,10,22,1,0)"
+        )
+    return tuple(map(int, m.groups()))
+
+def _parse_analog_args(values):
+    """--analog-config values -> keyword arguments for OutputController.set_analog_output()"""
+    config = ",".join(values)
+    head = _ANALOG_HEAD_RE.match(config)
+    if not head:
+        raise argparse.ArgumentTypeError(
+            "requires at least channel, polarity, and mode: "
+            "<channel> <polarity> <mode> [additional args based on mode]"
+        )
+
+    channel, polarity, mode = map(int, head.groups())
+    pattern = _ANALOG_RES.get(mode)
+    if pattern is None:
+        raise argparse.ArgumentTypeError("mode must be 0-4")
+    m = pattern.match(config)
+    if not m:
+        raise argparse.ArgumentTypeError(_ANALOG_MODE_USAGE[mode])
+
+    kwargs = {'channel': channel, 'polarity': polarity, 'mode': mode}
+    if mode == 1:  # Channel
+        kwargs.update(
+            input_channel=int(m.group(1)), data_source=int(m.group(2)),
+            high_value=float(m.group(3)), low_value=float(m.group(4)),
+        )
+    elif mode == 2:  # Manual
+        kwargs['manual_value'] = float(m.group(1))
+    return kwargs
+
+class _RangeConfigAction(argparse.Action):
+    """Store --set-range INPUT CONFIG as (input, (mode, excitation, range, autorange, cs_off))"""
+    def __call__(self, parser, namespace, values, option_string=None):
+        input_str, config_str = values
+        if not input_str.isdecimal():
+            raise argparse.ArgumentError(self, f"input must be an integer, got '{input_str}'")
+        try:
+            setattr(namespace, self.dest, (int(input_str), _parse_range_config(config_str)))
+        except argparse.ArgumentTypeError as e:
+            raise argparse.ArgumentError(self, str(e))
 
-def main():
+class _AnalogConfigAction(argparse.Action):
+    """Store --analog-config values as set_analog_output() keyword arguments"""
+    def __call__(self, parser, namespace, values, option_string=None):
+        try:
+            setattr(namespace, self.dest, _parse_analog_args(values))
+        except argparse.ArgumentTypeError as e:
+            raise argparse.ArgumentError(self, str(e))
+
+def _build_parser():
     parser = argparse.ArgumentParser(
         description="Lakeshore 370 AC Resistance Bridge CLI"
     )
@@ -27,7 +655,7 @@ def main():
     
     # Range operations
     parser.add_argument("--get-range", type=int, metavar='INPUT', help="Get resistance range configuration (RDGRNG? <input>)")
-    parser.add_argument("--set-range", nargs=2, metavar=('INPUT', 'CONFIG'), help="Set resistance range (RDGRNG <input>,<config>)")
+    parser.add_argument("--set-range", nargs=2, action=_RangeConfigAction, metavar=('INPUT', 'CONFIG'), help="Set resistance range (RDGRNG <input>,<config>)")
     
     # Heater control arguments
     parser.add_argument("--heater-output", type=float, metavar='PERCENT', help="Set heater output percentage (MOUT <percent>)")
@@ -37,7 +665,7 @@ def main():
     parser.add_argument("--get-heater-status", action="store_true", help="Get heater status (HTRST?)")
     
     # Analog output arguments
-    parser.add_argument("--analog-config", nargs='+', metavar=('CHANNEL', 'ARGS'), help="Set analog output config (ANALOG <channel>,<polarity>,<mode>,[other args])")
+    parser.add_argument("--analog-config", nargs='+', action=_AnalogConfigAction, metavar=('CHANNEL', 'ARGS'), help="Set analog output config (ANALOG <channel>,<polarity>,<mode>,[other args])")
     parser.add_argument("--get-analog-config", type=int, metavar='CHANNEL', help="Get analog output configuration (ANALOG? <channel>)")
     parser.add_argument("--get-analog-output", type=int, metavar='CHANNEL', help="Get analog output value (AOUT? <channel>)")
     
@@ -45,399 +673,76 @@ def main():
     parser.add_argument("--scan", nargs='*', metavar='INPUT', help="Scan multiple inputs (RDGK?, RDGR?, RDGS?, RDGPWR?, RDGST?)")
     parser.add_argument("--scan-range", nargs=2, type=int, metavar=('START', 'STOP'), help="Scan input range (multiple commands)")
     parser.add_argument("--all", action="store_true", help="Read all inputs 1-16 (RDGK?, RDGR?, RDGPWR?)")
+    parser.add_argument("--no-batch", action="store_true", help="Send scan queries one at a time instead of one compound query per input")
+    parser.add_argument("--format", choices=['pretty', 'json', 'csv', 'tsv'], default='pretty', help="Scan output format (default: pretty); other formats print only the data to stdout")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Run scans over an asyncio connection (requires pyserial-asyncio-fast; scan options only)")
     
     # Serial communication settings
     parser.add_argument("--port", default="/dev/ttyUSB1", help="Serial port (default: /dev/ttyUSB1)")
+    parser.add_argument("--ports", type=_parse_ports, metavar="PORT,PORT,...", help="Scan several bridges in parallel, one per port (scan options only)")
     parser.add_argument("--baudrate", type=int, default=9600, choices=[300, 1200, 9600], help="Baud rate (default: 9600)")
+    parser.add_argument("--no-lowlat", action="store_true", help="Leave the USB-serial latency timer and low_latency flag untouched")
     parser.add_argument("--get-baud", action="store_true", help="Get current baud rate setting (BAUD?)")
     parser.add_argument("--set-baud", type=int, choices=[0, 1, 2], help="Set baud rate (BAUD <code>)")
     
     # Raw command
     parser.add_argument("--raw-command", type=str, help="Send raw command to device")
-    
-    args = parser.parse_args()
 
-    try:
-        temp_reader = TemperatureReader(port=args.port, baudrate=args.baudrate)
+    return parser
 
-        if args.raw_command:
-            print(f"Command: {args.raw_command}")
-            response = temp_reader.send_command(args.raw_command)
-            print(f"Response: {response}")
-            return
+# Built once at import so repeated in-process calls to main() reuse it
+PARSER = _build_parser()
 
-        # Device information
-        if args.info:
-            print("Device Information:")
-            print("Command: *IDN?")
-            identification = temp_reader.get_identification()
-            print("Command: BAUD?")
-            baud_rate = temp_reader.get_baud_rate()
-            print(f"  ID: {identification}")
-            print(f"  Baud Rate Code: {baud_rate} (0=300, 1=1200, 2=9600)")
-            print()
-
-        # Baud rate operations
-        if args.get_baud:
-            print("Command: BAUD?")
-            baud_code = temp_reader.get_baud_rate()
-            baud_map = {"0": "300", "1": "1200", "2": "9600"}
-            baud_str = baud_map.get(baud_code, f"Unknown ({baud_code})")
-            print(f"Current baud rate: {baud_str} baud (code: {baud_code})")
-
-        if args.set_baud is not None:
-            print(f"Command: BAUD {args.set_baud}")
-            print(f"Setting baud rate to code {args.set_baud}...")
-            temp_reader.set_baud_rate(args.set_baud)
-            print("Note: You may need to reconnect with the new baud rate")
-
-        # Single input readings
-        if args.read_temp is not None:
-            print(f"Command: RDGK? {args.read_temp}")
-            temp = temp_reader.read_kelvin_temperature(args.read_temp)
-            if isinstance(temp, (int, float)):
-                print(f"Input {args.read_temp} Temperature: {temp:.3f} K")
-            else:
-                print(f"Input {args.read_temp} Temperature: {temp}")
+def main(argv=None):
+    args = PARSER.parse_args(argv)
+    _check_scan_only(args)
+    # Scan data is written here; with --format json/csv/tsv all other messages go to stderr
+    args.data_out = sys.stdout
+    messages = contextlib.redirect_stdout(sys.stderr) if args.format != 'pretty' else contextlib.nullcontext()
 
-        if args.read_resistance is not None:
-            print(f"Command: RDGR? {args.read_resistance}")
-            resistance = temp_reader.read_resistance(args.read_resistance)
-            if isinstance(resistance, (int, float)):
-                print(f"Input {args.read_resistance} Resistance: {resistance:.4f} Ω")
-            else:
-                print(f"Input {args.read_resistance} Resistance: {resistance}")
+    import serial
+    from .temperature import TemperatureReader
 
-        if args.read_sensor is not None:
-            print(f"Command: RDGS? {args.read_sensor}")
-            sensor = temp_reader.read_sensor(args.read_sensor)
-            if isinstance(sensor, (int, float)):
-                print(f"Input {args.read_sensor} Sensor: {sensor:.6f}")
-            else:
-                print(f"Input {args.read_sensor} Sensor: {sensor}")
-
-        if args.read_power is not None:
-            print(f"Command: RDGPWR? {args.read_power}")
-            power = temp_reader.read_excitation_power(args.read_power)
-            if isinstance(power, (int, float)):
-                if power < 1e-12:  # Less than 1 pW
-                    print(f"Input {args.read_power} Power: {power*1e15:.3f} fW")
-                elif power < 1e-9:  # Less than 1 nW
-                    print(f"Input {args.read_power} Power: {power*1e12:.3f} pW")
-                elif power < 1e-6:  # Less than 1 µW
-                    print(f"Input {args.read_power} Power: {power*1e9:.3f} nW")
-                elif power < 1e-3:  # Less than 1 mW
-                    print(f"Input {args.read_power} Power: {power*1e6:.3f} µW")
-                else:
-                    print(f"Input {args.read_power} Power: {power*1e3:.3f} mW")
-            else:
-                print(f"Input {args.read_power} Power: {power}")
+    # Entered outside the try so the error messages below go to stderr too
+    with messages:
+        try:
+            # Everything entered on the stack is closed once, in reverse order, on the way out
+            with contextlib.ExitStack() as stack:
+                if args.use_async:
+                    import asyncio
+                    asyncio.run(amain(args))
+                    return
 
-        if args.read_status is not None:
-            print(f"Command: RDGST? {args.read_status}")
-            status = temp_reader.read_status(args.read_status)
-            if isinstance(status, int):
-                print(f"Input {args.read_status} Status: {status} (0x{status:02X})")
-            else:
-                print(f"Input {args.read_status} Status: {status}")
-
-        # Range operations
-        if args.get_range is not None:
-            print(f"Command: RDGRNG? {args.get_range}")
-            range_config = temp_reader.get_resistance_range(args.get_range)
-            print(f"Input {args.get_range} Resistance Range Configuration:")
-            if isinstance(range_config, dict):
-                print(f"  Format: <mode>,<excitation>,<range>,<autorange>,<cs_off>")
-                print(f"  Response: {range_config['mode']},{range_config['excitation']},{range_config['range']},{range_config['autorange']},{range_config['cs_off']}")
-                print(f"  Parsed:")
-                print(f"    Mode: {range_config['mode']} (0=manual, 1=current, 2=voltage)")
-                print(f"    Excitation: {range_config['excitation']} (level 1-22)")
-                print(f"    Range: {range_config['range']} (range 1-22)")
-                print(f"    Autorange: {range_config['autorange']} (0=off, 1=on)")
-                print(f"    Current Source: {range_config['cs_off']} (0=on, 1=off)")
-            else:
-                print(f"  Format: <mode>,<excitation>,<range>,<autorange>,<cs_off>")
-                print(f"  Response: {range_config}")
-
-        if args.set_range is not None:
-            input_num, config_str = args.set_range
-            try:
-                input_num = int(input_num)
-                # Parse the comma-separated configuration string
-                config_parts = config_str.split(',')
-                if len(config_parts) != 5:
-                    print("Error: Configuration must have exactly 5 comma-separated values: <mode>,<excitation>,<range>,<autorange>,<cs_off>")
+                if args.ports:
+                    _run_ports(args, stack)
                     return
-                
-                mode, excitation, range_code, autorange, cs_off = map(int, config_parts)
-                print(f"Command: RDGRNG {input_num},{mode},{excitation},{range_code},{autorange},{cs_off}")
-                
-                success = temp_reader.set_resistance_range(input_num, mode, excitation, range_code, autorange, cs_off)
-                if success:
-                    print(f"Command sent successfully for input {input_num}")
-                    print(f"  Mode: {mode} (0=manual, 1=current, 2=voltage)")
-                    print(f"  Excitation: {excitation} (level 1-22)")
-                    print(f"  Range: {range_code} (range 1-22)")
-                    print(f"  Autorange: {autorange} (0=off, 1=on)")
-                    print(f"  Current Source: {cs_off} (0=on, 1=off)")
-                    print()
-                    print(f"Verify the setting with: lakeshore370 --get-range {input_num}")
-                else:
-                    print(f"Failed to send command for input {input_num}")
-            except ValueError as e:
-                print(f"Error parsing configuration: {e}")
-                print("Configuration format: <mode>,<excitation>,<range>,<autorange>,<cs_off>")
-                print("Example: --set-range 1 1,10,22,1,0")
-
-        # Analog output and heater control
-        if (
-            args.heater_output is not None or args.get_heater_output or
-            args.heater_range is not None or args.get_heater_range or
-            args.get_heater_status or args.analog_config is not None or
-            args.get_analog_config is not None or args.get_analog_output is not None
-        ):
-            output_ctrl = OutputController(port=args.port, baudrate=args.baudrate)
-            
-            if args.heater_output is not None:
-                print(f"Command: MOUT {args.heater_output:.3f}")
-                success = output_ctrl.set_heater_output(args.heater_output)
-                if success:
-                    print(f"Heater output set to {args.heater_output:.3f}%")
-                else:
-                    print("Failed to set heater output")
-
-            if args.get_heater_output:
-                print("Command: HTR?")
-                output = output_ctrl.get_heater_output()
-                if isinstance(output, (int, float)):
-                    print(f"Current heater output: {output:.3f}%")
-                else:
-                    print(f"Heater output: {output}")
-
-            if args.heater_range is not None:
-                print(f"Command: HTRRNG {args.heater_range}")
-                success = output_ctrl.set_heater_range(args.heater_range)
-                if not success:
-                    print("Failed to set heater range")
-
-            if args.get_heater_range:
-                print("Command: HTRRNG?")
-                range_code = output_ctrl.get_heater_range()
-                if isinstance(range_code, int):
-                    range_names = {
-                        0: "Off", 1: "31.6 µA (0.1 µW)", 2: "100 µA (1 µW)", 3: "316 µA (10 µW)",
-                        4: "1 mA (100µW)", 5: "3.16 mA (1 mW)", 6: "10 mA (10 mW)", 
-                        7: "31.6 mA (100 mW)", 8: "100 mA (1 W)"
-                    }
-                    print(f"Current heater range: {range_code} - {range_names.get(range_code, 'Unknown')}")
-                else:
-                    print(f"Heater range: {range_code}")
-
-            if args.get_heater_status:
-                print("Command: HTRST?")
-                status = output_ctrl.get_heater_status()
-                if isinstance(status, int):
-                    print(f"Heater status: {status} (0x{status:02X})")
-                else:
-                    print(f"Heater status: {status}")
-
-            # Analog output operations
-            if args.analog_config is not None:
-                try:
-                    if len(args.analog_config) < 3:
-                        print("Error: --analog-config requires at least channel, polarity, and mode")
-                        print("Usage: --analog-config <channel> <polarity> <mode> [additional args based on mode]")
-                        return
-                    
-                    channel = int(args.analog_config[0])
-                    polarity = int(args.analog_config[1])
-                    mode = int(args.analog_config[2])
-                    
-                    if mode == 0:  # Off
-                        print(f"Command: ANALOG {channel},{polarity},{mode},0,0,0,0,0")
-                        success = output_ctrl.set_analog_output(channel, polarity, mode)
-                    elif mode == 1:  # Channel
-                        if len(args.analog_config) < 7:
-                            print("Error: Channel mode requires: <channel> <polarity> <mode> <input_channel> <data_source> <high_value> <low_value>")
-                            return
-                        input_channel = int(args.analog_config[3])
-                        data_source = int(args.analog_config[4])
-                        high_value = float(args.analog_config[5])
-                        low_value = float(args.analog_config[6])
-                        print(f"Command: ANALOG {channel},{polarity},{mode},{input_channel},{data_source},{high_value},{low_value},0")
-                        success = output_ctrl.set_analog_output(channel, polarity, mode, input_channel, data_source, high_value, low_value)
-                    elif mode == 2:  # Manual
-                        if len(args.analog_config) < 4:
-                            print("Error: Manual mode requires: <channel> <polarity> <mode> <manual_value>")
-                            return
-                        manual_value = float(args.analog_config[3])
-                        print(f"Command: ANALOG {channel},{polarity},{mode},0,0,0,0,{manual_value}")
-                        success = output_ctrl.set_analog_output(channel, polarity, mode, manual_value=manual_value)
-                    elif mode == 3:  # Zone
-                        print(f"Command: ANALOG {channel},{polarity},{mode},0,0,0,0,0")
-                        success = output_ctrl.set_analog_output(channel, polarity, mode)
-                    elif mode == 4:  # Still (channel 2 only)
-                        print(f"Command: ANALOG {channel},{polarity},{mode},0,0,0,0,0")
-                        success = output_ctrl.set_analog_output(channel, polarity, mode)
-                    else:
-                        print("Error: Mode must be 0-4")
-                        return
-                    
-                    if success:
-                        print(f"Analog output {channel} configuration set successfully")
-                    else:
-                        print(f"Failed to set analog output {channel} configuration")
-                        
-                except (ValueError, IndexError) as e:
-                    print(f"Error parsing analog configuration: {e}")
-                    print("Usage: --analog-config <channel> <polarity> <mode> [additional args based on mode]")
-
-            if args.get_analog_config is not None:
-                print(f"Command: ANALOG? {args.get_analog_config}")
-                config = output_ctrl.get_analog_output_config(args.get_analog_config)
-                if isinstance(config, dict):
-                    print(f"Analog output {args.get_analog_config} configuration:")
-                    mode_names = {0: "Off", 1: "Channel", 2: "Manual", 3: "Zone", 4: "Still"}
-                    polarity_names = {0: "Unipolar", 1: "Bipolar"}
-                    source_names = {1: "Kelvin", 2: "Ohms", 3: "Linear Data"}
-                    
-                    print(f"  Polarity: {config['polarity']} ({polarity_names.get(config['polarity'], 'Unknown')})")
-                    print(f"  Mode: {config['mode']} ({mode_names.get(config['mode'], 'Unknown')})")
-                    print(f"  Channel: {config['channel']}")
-                    print(f"  Data Source: {config['data_source']} ({source_names.get(config['data_source'], 'Unknown')})")
-                    print(f"  High Value: {config['high_value']}")
-                    print(f"  Low Value: {config['low_value']}")
-                    print(f"  Manual Value: {config['manual_value']}")
-                else:
-                    print(f"Analog output {args.get_analog_config} configuration: {config}")
-
-            if args.get_analog_output is not None:
-                print(f"Command: AOUT? {args.get_analog_output}")
-                output = output_ctrl.get_analog_output_value(args.get_analog_output)
-                if isinstance(output, (int, float)):
-                    print(f"Analog output {args.get_analog_output} current value: {output:.3f}%")
-                else:
-                    print(f"Analog output {args.get_analog_output} value: {output}")
-                    
-            # Close the output controller connection
-            try:
-                output_ctrl.close()
-            except:
-                pass
-
-        # Range scanning and all inputs
-        if args.scan_range is not None or args.all:
-            if args.scan_range:
-                start, stop = args.scan_range
-                input_list = list(range(start, stop + 1))
-                print(f"Commands: RDGK?, RDGR?, RDGPWR?, RDGST? for inputs {start}-{stop}")
-                print(f"Scanning input range {start} to {stop}:")
-            else:  # args.all
-                input_list = [1, 2]  # Model 370 has only 2 inputs
-                print("Commands: RDGK?, RDGR?, RDGPWR? for inputs 1-2")
-                print("Reading all inputs (1-2):")
-                
-            results = temp_reader.scan_inputs(input_list)
-            
-            for input_ch, data in results.items():
-                temp = data['temperature']
-                resistance = data['resistance']
-                power = data['power']
-                status = data.get('status')  # status might not be in 'all' mode
-                
-                # Only print inputs that have valid data
-                if temp != "NO_RESPONSE" or resistance != "NO_RESPONSE":
-                    print(f"Input {input_ch:2d}:", end="")
-                    
-                    # Temperature formatting
-                    if isinstance(temp, (int, float)):
-                        print(f" Temp: {temp:8.3f} K", end="")
-                    else:
-                        print(f" Temp: {temp:>12s}", end="")
-                        
-                    # Resistance formatting  
-                    if isinstance(resistance, (int, float)):
-                        print(f" | Res: {resistance:10.4f} Ω", end="")
-                    else:
-                        print(f" | Res: {resistance:>12s}", end="")
-                        
-                    # Power formatting
-                    if isinstance(power, (int, float)):
-                        if power < 1e-12:
-                            print(f" | Pwr: {power*1e15:8.1f} fW", end="")
-                        elif power < 1e-9:
-                            print(f" | Pwr: {power*1e12:8.1f} pW", end="")
-                        else:
-                            print(f" | Pwr: {power*1e9:8.1f} nW", end="")
-                    else:
-                        print(f" | Pwr: {power:>10s}", end="")
-
-                    # Status formatting (only for scan_range)
-                    if args.scan_range and status is not None:
-                        if isinstance(status, int):
-                            print(f" | St: 0x{status:02X}")
-                        else:
-                            print(f" | St: {status:>6s}")
-                    else:
-                        print()  # Just newline for 'all' mode
-
-        # Multiple input scanning (detailed view)
-        if args.scan is not None:
-            if len(args.scan) == 0:
-                input_list = [1, 2]  # Default scan inputs 1-2 (Model 370 has only 2 inputs)
-            else:
-                try:
-                    input_list = [int(x) for x in args.scan]
-                except ValueError:
-                    print("Error: Invalid input numbers for --scan")
+
+                temp_reader = stack.enter_context(TemperatureReader(port=args.port, baudrate=args.baudrate, compound=not args.no_batch, low_latency=not args.no_lowlat))
+
+                # Heater/analog options share one OutputController on the reader's port
+                @functools.lru_cache(maxsize=1)
+                def get_output_ctrl():
+                    from .outputs import OutputController
+                    return stack.enter_context(OutputController(ser=temp_reader.ser, lock=temp_reader.lock, port_state=temp_reader.port_state))
+
+                if args.raw_command:
+                    _handle_raw_command(args, temp_reader, get_output_ctrl)
                     return
 
-            print(f"Commands: RDGK?, RDGR?, RDGS?, RDGPWR?, RDGST? for inputs {input_list}")
-            print(f"Scanning inputs: {input_list}")
-            results = temp_reader.scan_inputs(input_list)
-            
-            for input_ch, data in results.items():
-                print(f"Input {input_ch}:")
-                temp = data['temperature']
-                resistance = data['resistance']
-                sensor = data['sensor']
-                power = data['power']
-                status = data['status']
-                
-                # Helper function for power formatting
-                def format_power(p):
-                    if isinstance(p, (int, float)):
-                        if p < 1e-12:
-                            return f"{p*1e15:.3f} fW"
-                        elif p < 1e-9:
-                            return f"{p*1e12:.3f} pW"
-                        elif p < 1e-6:
-                            return f"{p*1e9:.3f} nW"
-                        else:
-                            return f"{p*1e6:.3f} µW"
-                    return str(p)
-                
-                # Print formatted results
-                print(f"  Temperature: {temp:.3f} K" if isinstance(temp, (int, float)) else f"  Temperature: {temp}")
-                print(f"  Resistance:  {resistance:.4f} Ω" if isinstance(resistance, (int, float)) else f"  Resistance:  {resistance}")
-                print(f"  Sensor:      {sensor:.6f}" if isinstance(sensor, (int, float)) else f"  Sensor:      {sensor}")
-                print(f"  Power:       {format_power(power)}")
-                print(f"  Status:      {status} (0x{status:02X})" if isinstance(status, int) else f"  Status:      {status}")
-                print()
-
-    # Handle serial connection issues
-    except serial.SerialException as e:
-        print(f"Serial connection error: {e}")
-        print(f"Make sure the Lakeshore 370 is connected to {args.port} and the port is correct.")
-    except KeyboardInterrupt:
-        print("\nInterrupted by user")
-    except Exception as e:
-        print(f"Error: {e}")
-    finally:
-        try:
-            temp_reader.close()
-        except:
-            pass
+                for name, handler in HANDLERS.items():
+                    value = getattr(args, name)
+                    if value is None or value is False:
+                        continue
+                    handler(args, temp_reader, get_output_ctrl)
+
+        # Handle serial connection issues
+        except serial.SerialException as e:
+            # A --ports scan error could come from any of the bridges
+            _print_serial_error(e, ",".join(args.ports) if args.ports else args.port)
+        except KeyboardInterrupt:
+            print("\nInterrupted by user")
+        except Exception as e:
+            print(f"Error: {e}")
 
 if __name__ == "__main__":
     main()
@@ -466,6 +771,10 @@ if __name__ == "__main__":
 #   
 #   lakeshore370 --scan                          Scan default inputs (1-2) (RDGK?, RDGR?, RDGPWR?, RDGST?)
 #   lakeshore370 --all                           Read all inputs (1-2) (RDGK?, RDGR?, RDGPWR?)
+#   lakeshore370 --scan --ports /dev/ttyUSB4,/dev/ttyUSB5  Scan two bridges in parallel
+#   lakeshore370 --scan --no-batch               Scan without compound queries (one command per reading)
+#   lakeshore370 --scan-range 1 16 --async       Scan inputs 1-16 using asyncio (needs pyserial-asyncio-fast)
+#   lakeshore370 --scan-range 1 16 --format csv  Scan inputs 1-16, CSV on stdout (messages on stderr)
 #   lakeshore370 --raw-command "RDGK? 1"         Send raw command
 
 # Range Configuration Format (for --set-range):
@@ -505,4 +814,7 @@ if __name__ == "__main__":
 
 # Serial Settings:
 #   Default: 9600 baud, 7-bit data, odd parity, 1 stop bit
-#   Port: /dev/ttyUSB1 (use --port to change)
\ No newline at end of file
+#   Port: /dev/ttyUSB1 (use --port to change)
+#   On Linux the FTDI latency timer is set to 1 ms on connect (use --no-lowlat to skip);
+#   writing it needs root, otherwise: echo 1 | sudo tee /sys/bus/usb-serial/devices/ttyUSB1/latency_timer
+#   On Windows set Device Manager -> Port Settings -> Advanced -> Latency Timer (msec) to 1
\ No newline at end of file
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Scan several Lakeshore 370 bridges at once, one thread per bridge
+
+Each bridge sits on its own serial port and pyserial releases the GIL while it
+waits on the port, so the scans run side by side instead of one after another.
+
+Used by main.py for --ports
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+def scan_many(readers, input_list=None):
+    """
+    Run scan_inputs() on every reader in parallel
+
+    Args:
+        readers (list): Connected TemperatureReader objects, one per port
+        input_list (list): Inputs to scan on each bridge (default: the scan_inputs default)
+
+    Returns:
+        dict: {reader.port: scan_inputs() results}, in the order of readers
+    """
+    if not readers:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=len(readers)) as executor:
+        results = executor.map(lambda reader: reader.scan_inputs(input_list), readers)
+        return dict(zip((reader.port for reader in readers), results))
@@ -6,11 +6,35 @@ Its functions are called upon in main.py for command line operations
 """
 
 import serial
-import time
+import threading
+from types import MappingProxyType
+from .port import PortState, locked
+
+_HEATER_RANGE_NAMES = MappingProxyType({
+    0: "Off",
+    1: "31.6 µA (0.1 µW into 100 Ω)",
+    2: "100 µA (1 µW into 100 Ω)",
+    3: "316 µA (10 µW into 100 Ω)",
+    4: "1 mA (100 µW into 100 Ω)",
+    5: "3.16 mA (1 mW into 100 Ω)",
+    6: "10 mA (10 mW into 100 Ω)",
+    7: "31.6 mA (100 mW into 100 Ω)",
+    8: "100 mA (1 W into 100 Ω)"
+})
 
 class OutputController:
     
-    def __init__(self, ser=None, port='/dev/ttyUSB1', baudrate=9600):
+    def __init__(self, ser=None, port='/dev/ttyUSB1', baudrate=9600, lock=None, port_state=None):
+        # Pass an already open port (e.g. TemperatureReader.ser) to share one connection;
+        # a shared port is left open by close() and stays owned by its creator.
+        # Share the reader's lock too so commands from both never interleave on the wire,
+        # and its port_state so a reply one of them gave up on is drained before the other's
+        # next query
+        self.lock = lock if lock is not None else threading.RLock()
+        self._owns_ser = ser is None
+        # port_state.stale is set when unread input may be left over (timeout, error, shared port)
+        # and cleared before the next query
+        self.port_state = port_state if port_state is not None else PortState(stale=ser is not None)
         if ser is not None:
             self.ser = ser
         else:
@@ -20,33 +44,55 @@ class OutputController:
                 bytesize=7, 
                 parity='O', 
                 stopbits=1, 
-                timeout=2
+                timeout=2,
+                inter_byte_timeout=0.05  # Give up on a reply that stalls part way through
             )
     
+    @locked
     def send_command(self, command):
         try:
-            self.ser.reset_input_buffer()
+            if self.port_state.stale:
+                self._drain_stale()
             
             self.ser.write((command + '\r\n').encode('ascii'))
-            time.sleep(0.2)
             
-            response = self.ser.readline().decode('ascii', errors='ignore').strip()
-            return response
+            # Take whatever has arrived per read() instead of readline's one byte at a time,
+            # returning as soon as the reply's \n is in (or a read times out)
+            response = b''
+            while b'\n' not in response:
+                chunk = self.ser.read(self.ser.in_waiting or 1)
+                if not chunk:
+                    # Timed out, the rest of this reply may still turn up
+                    self.port_state.stale = True
+                    break
+                response += chunk
+
+            reply, _, extra = response.partition(b'\n')
+            if extra:
+                # More than one line came back, drop the rest before the next query
+                self.port_state.stale = True
+            return reply.decode('ascii', errors='ignore').strip()
             
         except Exception as e:
+            self.port_state.stale = True
             print(f"Communication error: {e}")
             return None
 
+    # Throw away unread input, e.g. a reply that arrived after its read timed out
+    def _drain_stale(self):
+        self.port_state.stale = False
+        if self.ser.in_waiting:
+            self.ser.reset_input_buffer()
+
+    @locked
     def set_heater_output(self, percent):
         if not isinstance(percent, (int, float)) or percent < 0.0 or percent > 100.0:
             raise ValueError("Percent must be a number between 0.0 and 100.0")
         
         try:
-            self.ser.reset_input_buffer()
-            
             command = f"MOUT {percent:.3f}"
             self.ser.write((command + '\r\n').encode('ascii'))
-            time.sleep(0.2) 
+            self.ser.flush()  # No reply to wait for, just let the command leave the port
             
             print(f"Set heater output to {percent:.3f}%")
             return True
@@ -65,6 +111,7 @@ class OutputController:
         except ValueError:
             return response
 
+    @locked
     def set_heater_range(self, range_code):
         """
         
@@ -76,25 +123,11 @@ class OutputController:
             raise ValueError("Range code must be an integer between 0 and 8")
         
         try:
-            self.ser.reset_input_buffer()
-
             command = f"HTRRNG {range_code}"
             self.ser.write((command + '\r\n').encode('ascii'))
-            time.sleep(0.2) 
+            self.ser.flush()  # No reply to wait for, just let the command leave the port
             
-            range_names = {
-                0: "Off",
-                1: "31.6 µA (0.1 µW into 100 Ω)",
-                2: "100 µA (1 µW into 100 Ω)", 
-                3: "316 µA (10 µW into 100 Ω)",
-                4: "1 mA (100 µW into 100 Ω)",
-                5: "3.16 mA (1 mW into 100 Ω)",
-                6: "10 mA (10 mW into 100 Ω)",
-                7: "31.6 mA (100 mW into 100 Ω)",
-                8: "100 mA (1 W into 100 Ω)"
-            }
-            
-            print(f"Set heater range to {range_code}: {range_names.get(range_code, 'Unknown')}")
+            print(f"Set heater range to {range_code}: {_HEATER_RANGE_NAMES.get(range_code, 'Unknown')}")
             return True
             
         except Exception as e:
@@ -121,6 +154,7 @@ class OutputController:
         except ValueError:
             return response
 
+    @locked
     def set_analog_output(self, channel, polarity, mode, input_channel=None, data_source=None, high_value=None, low_value=None, manual_value=None):
         """
         Set analog output configuration using ANALOG command
@@ -146,8 +180,6 @@ class OutputController:
             raise ValueError("Still mode (4) only available for channel 2")
             
         try:
-            self.ser.reset_input_buffer()
-            
             if mode == 0:  # Off
                 command = f"ANALOG {channel},{polarity},{mode},0,0,0,0,0"
             elif mode == 1:  # Channel
@@ -168,7 +200,7 @@ class OutputController:
                 command = f"ANALOG {channel},{polarity},{mode},0,0,0,0,0"
             
             self.ser.write((command + '\r\n').encode('ascii'))
-            time.sleep(0.2) 
+            self.ser.flush()  # No reply to wait for, just let the command leave the port
             
             print(f"Set analog output {channel} configuration")
             return True
@@ -217,8 +249,8 @@ class OutputController:
             return response
 
     def close(self):
-        """Close serial connection"""
-        if hasattr(self, 'ser') and self.ser.is_open:
+        """Close serial connection (only if this controller opened it)"""
+        if getattr(self, '_owns_ser', False) and getattr(self, 'ser', None) and self.ser.is_open:
             self.ser.close()
 
     def __del__(self):
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+State shared by the objects that talk over one serial port
+
+TemperatureReader and OutputController can share one connection (ser=); they
+then share its lock and PortState too, so their commands never interleave on
+the wire and a reply one of them gave up on is drained before the other's next query.
+"""
+
+import functools
+
+# Run the method while holding self.lock (an RLock, so locked methods can call each other)
+def locked(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+# Whether unread input may be left on a serial port (a reply that timed out, extra lines).
+# Objects sharing one port share one PortState, passed with lock=, so a timeout in one makes
+# the next command from any of them drain the port first
+class PortState:
+    def __init__(self, stale=False):
+        self.stale = stale
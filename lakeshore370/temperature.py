@@ -12,15 +12,324 @@ Serial Communication:
 
 """
 
+import array
+import functools
+import math
+import os
+import queue
+import re
+import select
 import serial
+import sys
+import threading
 import time
+from types import MappingProxyType
+from typing import Optional, Tuple
+from .port import PortState, locked
+
+# Error words in a reading reply; a plain number matches none of them, so one search clears it
+_ERR_RE = re.compile(r'OVER|NOT|NONE', re.IGNORECASE)
+_KELVIN_ERR_RE = re.compile(r'ERR|INVALID', re.IGNORECASE)
+
+# Error code for a reply containing an error word, or None if it should be parsed as a number.
+# Overload wins over "not configured" when both appear (OVERLD contains OVER)
+def _classify(response, over_code):
+    words = _ERR_RE.findall(response)
+    if not words:
+        return None
+    return over_code if any(word.upper() == "OVER" for word in words) else "NOT_CONFIGURED"
+
+# Parsers for single reading responses, shared by the per-command and compound scan paths.
+# Almost every reply is a plain number, so float() goes first and the error words are
+# only looked at when it fails
+def _parse_kelvin(response):
+    if not response:
+        return "NO_RESPONSE"
+    
+    try:
+        temp_value = float(response)
+    except ValueError:
+        flag = _classify(response, "T_OVER")
+        if flag:
+            return flag
+        if _KELVIN_ERR_RE.search(response):
+            return "T_OVER"
+        return response
+
+    # Check for reasonable temperature values
+    if temp_value <= 0.0:
+        return "T_OVER"
+    return temp_value
+
+def _parse_resistance(response):
+    if not response:
+        return "NO_RESPONSE"
+    
+    try:
+        resistance_value = float(response)
+    except ValueError:
+        # Handle common 370 error responses
+        return _classify(response, "R_OVER") or response
+
+    if resistance_value < 0.0:
+        return "R_OVER"
+    return resistance_value
+
+def _parse_power(response):
+    if not response:
+        return "NO_RESPONSE"
+    
+    try:
+        return float(response)
+    except ValueError:
+        return _classify(response, "PWR_OVER") or response
+
+def _parse_status(response):
+    if not response:
+        return "NO_RESPONSE"
+    
+    try:
+        return int(response)
+    except ValueError:
+        return response
+
+def _parse_sensor(response):
+    if not response:
+        return "NO_RESPONSE"
+    
+    try:
+        return float(response)
+    except ValueError:
+        # Handle common 370 error responses
+        return _classify(response, "SENSOR_OVER") or response
+
+# Queries behind the five fields of a scan_inputs result, in order
+_SCAN_QUERIES = ("RDGK?", "RDGR?", "RDGS?", "RDGPWR?", "RDGST?")
+
+# Parsers for the five replies of a scan, in _SCAN_QUERIES order
+_SCAN_PARSERS = (_parse_kelvin, _parse_resistance, _parse_sensor, _parse_power, _parse_status)
+
+# First words of the reading queries (encoded), whose replies change all the time
+_READING_QUERIES = frozenset(query.encode('ascii') for query in _SCAN_QUERIES)
+
+# Line terminator for commands and replies
+_TERM = b'\r\n'
+
+# Valid input numbers for the read paths; the `type(ch) is int` test in front of the set lookup
+# keeps out bools and floats such as 1.0, which compare equal to members of the set
+_VALID_CH = frozenset(range(1, 17))
+
+# Encoded "<query> <input>\r\n" lines for the reading queries, indexed by input (1-16)
+_QUERY_BYTES = {
+    query: [None] + [f"{query} {ch}\r\n".encode('ascii') for ch in range(1, 17)]
+    for query in _SCAN_QUERIES
+}
+
+# The five scan queries for each input (1-16); send_compound joins and encodes them
+_SCAN_COMMANDS = [None] + [tuple(f"{query} {ch}" for query in _SCAN_QUERIES) for ch in range(1, 17)]
+
+# Queries whose reply is changed by this library's own commands (SCAN from a pipelined scan)
+# and so must always be asked live
+_UNCACHEABLE_QUERIES = frozenset({b'SCAN?'})
+
+# True for lines made only of '?' queries other than _UNCACHEABLE_QUERIES; only their replies
+# may go in the disk cache
+def _is_query_line(data):
+    words = [part.split(None, 1)[0] for part in data.split(b';') if part.strip()]
+    return all(word.endswith(b'?') and word not in _UNCACHEABLE_QUERIES for word in words)
+
+def _open_disk_cache(cache_dir):
+    import sqlite3  # Only needed with cache_dir, so the CLI doesn't pay for importing it
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # The lock on the reader keeps access serialised, so the connection may follow it across threads
+    db = sqlite3.connect(os.path.join(cache_dir, "ls370.sqlite"), check_same_thread=False)
+    with db:
+        db.execute("CREATE TABLE IF NOT EXISTS replies (key TEXT PRIMARY KEY, val TEXT, ts REAL)")
+    return db
+
+# Encoded ';'-joined line for send_compound and the number of replies to expect ('?' queries only).
+# Scans send the same few lines over and over, so they are encoded once
+@functools.lru_cache(maxsize=256)
+def _encode_compound(cmds):
+    expected = sum(1 for cmd in cmds if cmd.split(None, 1)[0].endswith('?'))
+    return ";".join(cmds).encode('ascii') + _TERM, expected
+
+# Replies a line will bring back: one per '?' query, settings such as SCAN answer nothing
+def _count_queries(line):
+    return sum(1 for part in line.split(b';') if part.split() and part.split()[0].endswith(b'?'))
+
+# scan_inputs entry from the five replies of a compound scan query, in _SCAN_QUERIES order
+def _parse_scan_fields(fields):
+    return {
+        'temperature': _parse_kelvin(fields[0]),
+        'resistance': _parse_resistance(fields[1]),
+        'sensor': _parse_sensor(fields[2]),
+        'power': _parse_power(fields[3]),
+        'status': _parse_status(fields[4])
+    }
+
+# scan_inputs entry for an input that could not be read
+def _scan_error(e):
+    return {
+        'temperature': f'ERROR: {e}',
+        'resistance': f'ERROR: {e}',
+        'sensor': f'ERROR: {e}',
+        'power': f'ERROR: {e}',
+        'status': f'ERROR: {e}'
+    }
+
+# Row layout of scan_inputs_array(); readings that came back as error codes are NaN
+# (status 0) with their SCAN_FLAGS bit set in 'flags'
+SCAN_DTYPE = [('ch', 'i2'), ('temp', 'f8'), ('res', 'f8'), ('sensor', 'f8'), ('power', 'f8'), ('status', 'u2'), ('flags', 'u1')]
+SCAN_FLAGS = MappingProxyType({
+    'temperature': 0x01,
+    'resistance': 0x02,
+    'sensor': 0x04,
+    'power': 0x08,
+    'status': 0x10
+})
+
+# Contents of a scan_inputs_soa() column before the scan fills it in: NaN, or -1 for status
+_SOA_EMPTY = {
+    field: array.array('i', [-1] * 16) if field == 'status' else array.array('d', [math.nan] * 16)
+    for field in SCAN_FLAGS
+}
+
+# Records the logfile writer may fall behind by, and records written (and fsync'd) together
+_LOG_QUEUE_SIZE = 1024
+_LOG_BATCH = 64
+
+# Body of the logfile writer thread: blocks for the first queued record, takes whatever else is
+# waiting (up to _LOG_BATCH) and writes them with one write and one fsync. None stops it
+def _log_writer(log_q, log):
+    with log:
+        while True:
+            batch = [log_q.get()]
+            while batch[-1] is not None and len(batch) < _LOG_BATCH:
+                try:
+                    batch.append(log_q.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is None
+            if stop:
+                batch.pop()
+            if batch:
+                log.write("".join(f"{t:.3f}\t{query}\t{ch}\t{value}\n" for t, query, ch, value in batch))
+                log.flush()
+                os.fsync(log.fileno())
+            if stop:
+                return
+
+# Set once the sudo hint below has been printed, so a process opening several ports shows it once
+_latency_hint_shown = False
+
+# Drop the FTDI latency timer from the default 16 ms to 1 ms (Linux only, needs write access to sysfs)
+def _set_latency_timer(port):
+    global _latency_hint_shown
+
+    # e.g. /dev/ttyUSB1 -> /sys/bus/usb-serial/devices/ttyUSB1/latency_timer
+    tty = os.path.basename(os.path.realpath(port))
+    latency_path = f"/sys/bus/usb-serial/devices/{tty}/latency_timer"
+    try:
+        with open(latency_path) as f:
+            if f.read().strip() == "1":
+                return  # Already lowered (e.g. by a udev rule), nothing to write
+        with open(latency_path, "w") as f:
+            f.write("1")
+    except PermissionError:
+        if not _latency_hint_shown:
+            _latency_hint_shown = True
+            print(f"Hint: run 'echo 1 | sudo tee {latency_path}' to lower the USB latency timer", file=sys.stderr)
+    except OSError:
+        pass  # No such file: not a USB-serial adapter, or not Linux
+
+# Each reply otherwise waits up to 16 ms in the FTDI adapter before reaching us.
+# On Windows set Device Manager -> Port Settings -> Advanced -> Latency Timer to 1 ms instead
+def _enable_low_latency(ser, port):
+    if not sys.platform.startswith("linux"):
+        return
+
+    _set_latency_timer(port)
+    try:
+        # ASYNC_LOW_LATENCY via TIOCGSERIAL/TIOCSSERIAL, same as 'setserial <port> low_latency'
+        ser.set_low_latency_mode(True)
+    except (AttributeError, NotImplementedError, ValueError, OSError):
+        pass  # Older pyserial or a driver without serial_struct support
 
 class TemperatureReader:
-    def __init__(self, port="/dev/ttyUSB1", baudrate=9600, timeout=2):
+    def __init__(self, port="/dev/ttyUSB1", baudrate=9600, timeout=2, compound=True,
+                 low_latency=True, ser=None, lock=None, threaded=False, cache_ttl=0.25,
+                 inputs_per_line=1, cache_dir=None, disk_cache_ttl=60.0, logfile=None,
+                 port_state=None):
 
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
+        # Send scan queries as one ';'-joined line per input
+        # (set False for firmware that rejects it)
+        self.compound = compound
+        # Inputs packed into each compound scan line; one input's five queries are ~45 characters,
+        # so only raise this if the firmware accepts longer command lines
+        self.inputs_per_line = inputs_per_line
+        # Why the last read_* call returned None ("NO_RESPONSE", "T_OVER", ... or the raw reply)
+        self.last_error = None
+        # Replies to queries that don't change during a session, {command: (reply, time read)}
+        self._query_cache = {}
+        # read_* replies younger than cache_ttl seconds are reused (the 370 updates a reading
+        # about 10 times a second at most); cache_ttl=0 always asks the device.
+        # {(query, input): (reply, time read)}
+        self.cache_ttl = cache_ttl
+        self._reading_cache = {}
+        # Column arrays reused by every scan_inputs_soa() call, slot i holding input i + 1
+        self._soa = {
+            field: array.array(empty.typecode, empty) for field, empty in _SOA_EMPTY.items()
+        }
+        self._soa_views = MappingProxyType(
+            {field: memoryview(column) for field, column in self._soa.items()}
+        )
+        # Optional on-disk reply cache shared between runs (cache_dir/ls370.sqlite): query
+        # replies younger than disk_cache_ttl seconds (cache_ttl for readings) are served
+        # without touching the port. LS370_USE_CACHE=0 in the environment turns it off
+        self.disk_cache_ttl = disk_cache_ttl
+        self._disk_cache = None
+        # Whether the last reply came from the disk cache rather than the port (see _logged)
+        self._disk_hit = False
+        if cache_dir is not None and os.environ.get("LS370_USE_CACHE", "1") != "0":
+            self._disk_cache = _open_disk_cache(cache_dir)
+        # With logfile set, every reading a read_* call gets from the device (not from a cache)
+        # is appended to it as a "<unix time>\t<query>\t<input>\t<value>" line by a background
+        # thread (see _log_writer), so polling never waits on the disk. Records are dropped if
+        # the writer falls _LOG_QUEUE_SIZE behind
+        self._log_q = None
+        self._log_thread = None
+        if logfile is not None:
+            self._start_log_writer(logfile)
+        # Held for each exchange on the port; pass the same lock (and port_state) to an
+        # OutputController sharing ser
+        self.lock = lock if lock is not None else threading.RLock()
+
+        # Pass an already open port to share one connection;
+        # a shared port is left open by close() and stays owned by its creator
+        self._owns_ser = ser is None
+        # port_state.stale is set when unread input may be left over (timeout, error, shared port)
+        # and cleared before the next write
+        self.port_state = port_state if port_state is not None else PortState(stale=ser is not None)
+        # Replies collected by the background reader when threaded=True (see _start_reader_thread)
+        self._rx_queue = None
+        self._reader_thread = None
+        # Receive buffer reused for every reply: the first _rx_len bytes are data read from the
+        # port and not yet returned (see _fill_rx_fd). Grows if a reply doesn't fit
+        self._rx = bytearray(256)
+        self._rx_view = memoryview(self._rx)
+        self._rx_len = 0
+        # Replies still due to the command written by submit(), None when nothing is in flight
+        self._submitted = None
+        if ser is not None:
+            self.ser = ser
+            if threaded:
+                self._start_reader_thread()
+            return
         
         try:
             self.ser = serial.Serial(
@@ -31,140 +340,446 @@ class TemperatureReader:
                 stopbits=1,
                 timeout=timeout
             )
+            if low_latency:
+                _enable_low_latency(self.ser, port)
             self.ser.reset_input_buffer()
             self.ser.reset_output_buffer()
             time.sleep(0.1)
+            if threaded:
+                self._start_reader_thread()
             print(f"Connected to Lakeshore 370 on {port} at {baudrate} baud")
         except Exception as e:
             print(f"Failed to connect to Lakeshore 370: {e}")
             raise
 
+    # Read replies on a background thread (pyserial's ReaderThread) so each one is already
+    # split into a line by the time send_command looks for it. The thread takes every byte
+    # the port receives, so don't share the port with an OutputController in this mode
+    def _start_reader_thread(self):
+        import serial.threaded  # Only needed for threaded=True
+
+        rx_queue = queue.Queue()
+
+        class _ReplyReader(serial.threaded.LineReader):
+            TERMINATOR = _TERM
+            ENCODING = 'ascii'
+            UNICODE_HANDLING = 'ignore'
+
+            def handle_line(self, line):
+                rx_queue.put(line)
+
+        self._rx_queue = rx_queue
+        self._reader_thread = serial.threaded.ReaderThread(self.ser, _ReplyReader)
+        self._reader_thread.start()
+        self._reader_thread.connect()  # Wait until the thread is reading
+
+    def _start_log_writer(self, logfile):
+        log = open(logfile, 'a')  # Opened here so a bad path fails the constructor, not the thread
+        self._log_q = queue.Queue(_LOG_QUEUE_SIZE)
+        self._log_thread = threading.Thread(target=_log_writer, args=(self._log_q, log), daemon=True)
+        self._log_thread.start()
+
+    def _stop_log_writer(self):
+        self._log_q.put(None)  # Everything queued before this is still written
+        self._log_thread.join()
+        self._log_q = None
+        self._log_thread = None
+
     # Use for sending direct serial commands
     def send_command(self, command):
+        return self._send_bytes(command.encode('ascii') + _TERM)
+
+    # send_command for an already encoded, \r\n terminated line; ttl caps the age of a
+    # disk cache reply (see _disk_ttl).
+    # Only single queries use the disk cache here; a compound line's reply may span several
+    # lines, so send_compound caches it once every reply is in
+    @locked
+    def _send_bytes(self, data, ttl=None):
+        limit = 0 if b';' in data else self._disk_ttl(data, ttl)
+        if not limit:
+            return self._exchange(data)
+
+        response = self._disk_get(data, limit)
+        if response is None:
+            response = self._exchange(data)
+            self._disk_put(data, response)
+        return response
+
+    # Seconds a disk cache reply to this line stays good, 0 if the line doesn't use the cache.
+    # Readings keep cache_ttl, same as the in-memory reading cache, and everything else
+    # disk_cache_ttl; a caller's ttl (e.g. RDGRNG?'s 1 s) is never stretched
+    def _disk_ttl(self, data, ttl=None):
+        if self._disk_cache is None or not _is_query_line(data):
+            return 0
+        # Scan lines are all readings, so the first query decides
+        limit = self.cache_ttl if data.split(None, 1)[0] in _READING_QUERIES else self.disk_cache_ttl
+        return limit if ttl is None else min(limit, ttl)
+
+    # Disk cache reply for a line if it is younger than limit seconds, else None
+    def _disk_get(self, data, limit):
+        row = self._disk_cache.execute("SELECT val, ts FROM replies WHERE key = ?", (self._disk_key(data),)).fetchone()
+        self._disk_hit = row is not None and time.time() - row[1] < limit
+        return row[0] if self._disk_hit else None
+
+    def _disk_put(self, data, response):
+        if response:
+            with self._disk_cache:
+                self._disk_cache.execute("INSERT OR REPLACE INTO replies VALUES (?, ?, ?)", (self._disk_key(data), response, time.time()))
+
+    # Same command on another port is another bridge, so the port is part of the key.
+    # With ser= passed and no port=, self.port is only the default, so ask the port itself
+    def _disk_key(self, data):
+        import hashlib  # Only needed with cache_dir
+        port = getattr(self.ser, 'port', None) or self.port
+        return hashlib.sha256(port.encode() + b'\0' + data).hexdigest()
+
+    # One write and its reply on the wire. A compound line's replies are all read, whether they
+    # come on one ';' line or one line per query, and returned ';'-joined; `expected` is the
+    # number of '?' queries in data if the caller already knows it
+    def _exchange(self, data, expected=None):
+        self._disk_hit = False
+        if self._submitted is not None:
+            raise RuntimeError("receive() the reply to the submitted command first")
+        if expected is None:
+            expected = _count_queries(data) if b';' in data else 1
         try:
-            # Clear any leftover data
-            self.ser.reset_input_buffer()
-            
-            # Send command 
-            self.ser.write((command + '\r\n').encode('ascii'))
-            time.sleep(0.1)  # Allow time for device to respond
-            
-            # Read response
-            response = self.ser.read_until(b'\r\n')
-            if response:
-                decoded = response.decode('ascii', errors='ignore').strip()
-                # Remove any extra whitespace or control characters
-                decoded = decoded.replace('\r', '').replace('\n', '').strip()
-                return decoded
-            return None
+            self._write(data)
+            return self._receive_reply(expected)
         except Exception as e:
+            self.port_state.stale = True
             print(f"Communication error: {e}")
             return None
 
+    def _write(self, data):
+        # The 370 only talks when asked, so after a complete reply there is nothing to clear.
+        # Anything still in _rx is left over too (another object sharing port_state may have
+        # drained the port and cleared the flag since)
+        if self.port_state.stale or self._rx_len:
+            self._drain_stale()
+
+        # Send command 
+        self.ser.write(data)
+
+    # The reply to the line just written, `expected` replies long
+    def _receive_reply(self, expected):
+        # Returns as soon as the \r\n terminator arrives (or after timeout)
+        response = self._read_response()
+        if response is not None and expected > 1:
+            response = self._read_more(response, expected)
+        # More lines already in than the queries asked for: not the next command's reply
+        if self._rx_len or (self._rx_queue is not None and not self._rx_queue.empty()):
+            self.port_state.stale = True
+        return response
+
+    # Read reply lines after `response` until there is one reply per query. The next command
+    # must not take a late reply as its own, so a short count leaves the port stale
+    def _read_more(self, response, expected):
+        parts = [response]
+        count = response.count(';') + 1
+        while count < expected:
+            more = self._read_response()
+            if more is None:
+                self.port_state.stale = True
+                break
+            parts.append(more)
+            count += more.count(';') + 1
+        return ";".join(parts)
+
+    # Throw away unread input, e.g. a reply that arrived after its read timed out
+    def _drain_stale(self):
+        self.port_state.stale = False
+        if self._rx_queue is not None:
+            while not self._rx_queue.empty():
+                self._rx_queue.get_nowait()
+        elif self._rx_len or self.ser.in_waiting:
+            self._rx_len = 0
+            self.ser.reset_input_buffer()
+
+    # Read one \r\n terminated reply (None on timeout)
+    def _read_response(self):
+        if self._rx_queue is not None:
+            try:
+                return self._rx_queue.get(timeout=self.timeout).strip()
+            except queue.Empty:
+                # Timed out, the rest of this reply may still turn up
+                self.port_state.stale = True
+                return None
+
+        # Native POSIX ports expose their file descriptor; anything else (URL handlers, Windows)
+        # goes through pyserial's readinto()
+        fd = getattr(self.ser, 'fd', None) if os.name == 'posix' else None
+        end = self._fill_rx_fd(fd) if fd is not None else self._fill_rx_chunks()
+        if end < 0:
+            # Timed out, the rest of this reply may still turn up; hand back what did arrive
+            self.port_state.stale = True
+            end = self._rx_len
+        # Decode straight from the buffer; strip() drops the terminator and any padding
+        response = str(self._rx_view[:end], 'ascii', 'ignore').strip() if end else None
+        self._consume_rx(end)
+        return response
+
+    # Fill _rx from the file descriptor until it holds a terminator: select() waits for data and
+    # one readv() moves everything that has arrived into the free end of the buffer.
+    # Returns the length of the first reply including its terminator, or -1 on timeout
+    def _fill_rx_fd(self, fd):
+        deadline = None if self.ser.timeout is None else time.monotonic() + self.ser.timeout
+        end = self._rx.find(_TERM, 0, self._rx_len)
+        while end < 0:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                break
+            if self._rx_len == len(self._rx):
+                self._grow_rx()
+            n = os.readv(fd, [self._rx_view[self._rx_len:]])
+            if not n:
+                # Same as pyserial: readable but empty means the adapter went away
+                raise serial.SerialException("device reports readiness to read but returned no data")
+            # The terminator may straddle the old end of the data
+            end = self._rx.find(_TERM, max(self._rx_len - 1, 0), self._rx_len + n)
+            self._rx_len += n
+        return end if end < 0 else end + len(_TERM)
+
+    # Same as _fill_rx_fd for ports without a file descriptor: readinto() of up to in_waiting bytes
+    # takes everything that has arrived in one call instead of read_until's byte-sized reads
+    def _fill_rx_chunks(self):
+        deadline = None if self.ser.timeout is None else time.monotonic() + self.ser.timeout
+        end = self._rx.find(_TERM, 0, self._rx_len)
+        while end < 0:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            if self._rx_len == len(self._rx):
+                self._grow_rx()
+            # No slice of _rx_view may outlive this call, or _grow_rx() can't resize _rx
+            want = max(min(self.ser.in_waiting, len(self._rx) - self._rx_len), 1)
+            n = self.ser.readinto(self._rx_view[self._rx_len:self._rx_len + want])
+            if not n:
+                break
+            end = self._rx.find(_TERM, max(self._rx_len - 1, 0), self._rx_len + n)
+            self._rx_len += n
+        return end if end < 0 else end + len(_TERM)
+
+    # Move whatever has arrived into _rx without waiting (for poll())
+    def _fill_rx_now(self):
+        fd = getattr(self.ser, 'fd', None) if os.name == 'posix' else None
+        while True:
+            if fd is not None:
+                if not select.select([fd], [], [], 0)[0]:
+                    return
+            elif not self.ser.in_waiting:
+                return
+            if self._rx_len == len(self._rx):
+                self._grow_rx()
+            if fd is not None:
+                n = os.readv(fd, [self._rx_view[self._rx_len:]])
+                if not n:
+                    raise serial.SerialException("device reports readiness to read but returned no data")
+            else:
+                want = min(self.ser.in_waiting, len(self._rx) - self._rx_len)
+                n = self.ser.readinto(self._rx_view[self._rx_len:self._rx_len + want])
+                if not n:
+                    return
+            self._rx_len += n
+
+    # Replies in the complete lines held in _rx (a ';' line holds several)
+    def _replies_buffered(self):
+        count = 0
+        start = 0
+        while True:
+            end = self._rx.find(_TERM, start, self._rx_len)
+            if end < 0:
+                return count
+            count += self._rx.count(b';', start, end) + 1
+            start = end + len(_TERM)
+
+    # Drop the first `count` bytes of _rx, moving anything read past them to the front for the next reply
+    def _consume_rx(self, count):
+        rest = self._rx_len - count
+        if rest:
+            self._rx_view[:rest] = self._rx_view[count:self._rx_len]
+        self._rx_len = rest
+
+    # Double _rx when a reply outgrows it (long packed scan lines); the view has to be let go first
+    def _grow_rx(self):
+        self._rx_view.release()
+        try:
+            self._rx.extend(bytes(len(self._rx)))
+        finally:
+            # A fresh view either way, so a failed resize can't leave the reader without one
+            self._rx_view = memoryview(self._rx)
+
+    # Send several queries as one ';'-joined line and return one reply per query,
+    # or None if the device did not answer every query
+    # (setting commands such as SCAN may be mixed in; only the '?' queries reply)
+    @locked
+    def send_compound(self, cmds):
+        line, expected = _encode_compound(tuple(cmds))
+        limit = self._disk_ttl(line)
+        if limit:
+            cached = self._disk_get(line, limit)
+            if cached is not None:
+                return [reply.strip() for reply in cached.split(';')]
+
+        # _exchange reads every reply, on one ';' line or one line per query
+        response = self._exchange(line, expected)
+        if response is None or response == "":
+            return None
+
+        replies = [reply.strip() for reply in response.split(';')]
+        if len(replies) != expected:
+            return None
+        if limit:
+            self._disk_put(line, ";".join(replies))
+        return replies
+
+    # Write a command that has no reply (no read timeout to wait out)
+    @locked
+    def _send_setting(self, command):
+        self.ser.write(command.encode('ascii') + _TERM)
+        self.ser.flush()
+
+    # send_command, but reuse an earlier reply that is younger than ttl seconds (ttl=None: until invalidated)
+    def _cached_query(self, cmd, ttl=None):
+        cached = self._query_cache.get(cmd)
+        if cached is not None and (ttl is None or time.monotonic() - cached[1] < ttl):
+            return cached[0]
+
+        response = self._send_bytes(cmd.encode('ascii') + _TERM, ttl)
+        if response:
+            self._query_cache[cmd] = (response, time.monotonic())
+        return response
+
     # Print out device info (good for verification)
     def get_identification(self):
-        response = self.send_command("*IDN?")
+        response = self._cached_query("*IDN?")
         return response if response else "NO_RESPONSE"
 
     # Printing out baud rate
     def get_baud_rate(self):
-        response = self.send_command("BAUD?")
+        response = self._cached_query("BAUD?")
         return response if response else "NO_RESPONSE"
 
     def set_baud_rate(self, rate_code):
         if rate_code not in [0, 1, 2]:
             raise ValueError("Rate code must be 0 (300), 1 (1200), or 2 (9600)")
         
-        self.send_command(f"BAUD {rate_code}")
+        self._query_cache.pop("BAUD?", None)
+        self._clear_disk_cache()
+        self._send_setting(f"BAUD {rate_code}")
         print(f"Baud rate set to code {rate_code}")
 
-    def read_kelvin_temperature(self, input_channel):
-        if not isinstance(input_channel, int) or input_channel < 1 or input_channel > 16:
+    # Send "<query> <input>" and parse the reply; error replies come back as code strings
+    def _read(self, query, input_channel, parse, bypass_cache=False):
+        if type(input_channel) is not int or input_channel not in _VALID_CH:
             raise ValueError("Input channel must be an integer between 1 and 16")
 
-        response = self.send_command(f"RDGK? {input_channel}")
-        if response is None or response == "":
-            return "NO_RESPONSE"
-        
-        response_upper = response.upper()
-        if "OVERLD" in response_upper or "OVER" in response_upper:
-            return "T_OVER"
-        if "NOT" in response_upper or "NONE" in response_upper:
-            return "NOT_CONFIGURED"
-            
-        try:
-            temp_value = float(response)
-            # Check for reasonable temperature values
-            if temp_value <= 0.0:
-                return "T_OVER"
-            return temp_value
-        except ValueError:
-            if any(indicator in response_upper for indicator in ['OVER', 'ERR', 'INVALID']):
-                return "T_OVER"
-            return response
+        if bypass_cache or not self.cache_ttl:
+            return self._logged(query, input_channel, parse(self._send_bytes(_QUERY_BYTES[query][input_channel], 0)))
 
-    def read_resistance(self, input_channel):
-        if not isinstance(input_channel, int) or input_channel < 1 or input_channel > 16:
-            raise ValueError("Input channel must be an integer between 1 and 16")
+        key = (query, input_channel)
+        cached = self._reading_cache.get(key)
+        if cached is not None and time.monotonic() - cached[1] < self.cache_ttl:
+            # Logged when it came in, not again for every reuse
+            return parse(cached[0])
 
-        # Read resistance value using correct 370 command
-        response = self.send_command(f"RDGR? {input_channel}")
-        if response is None or response == "":
-            return "NO_RESPONSE"
-        
-        # Handle common 370 error responses
-        response_upper = response.upper()
-        if "OVERLD" in response_upper or "OVER" in response_upper:
-            return "R_OVER"
-        if "NOT" in response_upper or "NONE" in response_upper:
-            return "NOT_CONFIGURED"
-            
-        try:
-            resistance_value = float(response)
-            if resistance_value < 0.0:
-                return "R_OVER"
-            return resistance_value
-        except ValueError:
-            return response
+        response = self._send_bytes(_QUERY_BYTES[query][input_channel])
+        self._remember(query, input_channel, response)
+        return self._logged(query, input_channel, parse(response))
 
-    def read_excitation_power(self, input_channel):
-        if not isinstance(input_channel, int) or input_channel < 1 or input_channel > 16:
-            raise ValueError("Input channel must be an integer between 1 and 16")
+    # Keep a raw reading reply for later _read calls (within cache_ttl)
+    def _remember(self, query, input_channel, response):
+        if response and self.cache_ttl:
+            self._reading_cache[(query, input_channel)] = (response, time.monotonic())
 
-        response = self.send_command(f"RDGPWR? {input_channel}")
-        if response is None or response == "":
-            return "NO_RESPONSE"
-        
-        response_upper = response.upper()
-        if "OVERLD" in response_upper or "OVER" in response_upper:
-            return "PWR_OVER"
-        if "NOT" in response_upper or "NONE" in response_upper:
-            return "NOT_CONFIGURED"
-            
-        try:
-            power_value = float(response)
-            return power_value
-        except ValueError:
-            return response
+    # Hand a numeric reading to the logfile writer (if any) without waiting. Only call it right after
+    # the reading's exchange; error codes and replies served from the disk cache aren't logged
+    def _logged(self, query, input_channel, value):
+        if self._log_q is not None and not self._disk_hit and not isinstance(value, str):
+            try:
+                self._log_q.put_nowait((time.time(), query, input_channel, value))
+            except queue.Full:
+                pass  # Writer is behind; dropping the record beats stalling the poll
+        return value
 
-    def read_status(self, input_channel):
-        if not isinstance(input_channel, int) or input_channel < 1 or input_channel > 16:
+    # _read for an input the caller has already validated (scan loops check each input once).
+    # Skips the in-memory reading cache; with cache_dir set, a disk cache reply younger than
+    # cache_ttl is still used, the same as for compound scan lines
+    def _read_unchecked(self, query, input_channel, parse):
+        return parse(self._send_bytes(_QUERY_BYTES[query][input_channel]))
+
+    def _clear_disk_cache(self):
+        if self._disk_cache is not None:
+            with self._disk_cache:
+                self._disk_cache.execute("DELETE FROM replies")
+
+    def invalidate(self, channel=None):
+        """Forget cached replies for one input (readings and RDGRNG?), or everything when channel is None"""
+        # Disk cache keys are hashed, so any invalidation clears all of it
+        self._clear_disk_cache()
+        if channel is None:
+            self._reading_cache.clear()
+            self._query_cache.clear()
+            return
+
+        for key in [key for key in self._reading_cache if key[1] == channel]:
+            del self._reading_cache[key]
+        self._query_cache.pop(f"RDGRNG? {channel}", None)
+
+    # Numeric readings pass through; anything else is kept in last_error and None is returned
+    def _checked(self, value):
+        if isinstance(value, str):
+            self.last_error = value
+            return None
+        self.last_error = None
+        return value
+
+    def read_kelvin_temperature(self, input_channel: int, bypass_cache: bool = False) -> Optional[float]:
+        return self._checked(self._read("RDGK?", input_channel, _parse_kelvin, bypass_cache))
+
+    def read_resistance(self, input_channel: int, bypass_cache: bool = False) -> Optional[float]:
+        return self._checked(self._read("RDGR?", input_channel, _parse_resistance, bypass_cache))
+
+    def read_excitation_power(self, input_channel: int, bypass_cache: bool = False) -> Optional[float]:
+        return self._checked(self._read("RDGPWR?", input_channel, _parse_power, bypass_cache))
+
+    def read_status(self, input_channel: int, bypass_cache: bool = False) -> Optional[int]:
+        return self._checked(self._read("RDGST?", input_channel, _parse_status, bypass_cache))
+
+    # A reading and its RDGST? status bits from one compound query ("RDGST? n;<query> n").
+    # last_error follows the reading; the status is None if it could not be read
+    def _read_with_status(self, query, input_channel, parse):
+        if type(input_channel) is not int or input_channel not in _VALID_CH:
             raise ValueError("Input channel must be an integer between 1 and 16")
 
-        response = self.send_command(f"RDGST? {input_channel}")
-        if response is None or response == "":
-            return "NO_RESPONSE"
-        
-        try:
-            return int(response)
-        except ValueError:
-            return response
+        fields = None
+        if self.compound:
+            fields = self.send_compound([f"RDGST? {input_channel}", f"{query} {input_channel}"])
+        if fields is None:
+            status = self._logged("RDGST?", input_channel, self._read_unchecked("RDGST?", input_channel, _parse_status))
+            value = self._logged(query, input_channel, self._read_unchecked(query, input_channel, parse))
+        else:
+            status = self._logged("RDGST?", input_channel, _parse_status(fields[0]))
+            value = self._logged(query, input_channel, parse(fields[1]))
+            # A read_status()/read_* call right after this reuses the replies instead of asking again
+            self._remember("RDGST?", input_channel, fields[0])
+            self._remember(query, input_channel, fields[1])
+
+        return self._checked(value), status if isinstance(status, int) else None
+
+    def read_kelvin_with_status(self, input_channel: int) -> Tuple[Optional[float], Optional[int]]:
+        return self._read_with_status("RDGK?", input_channel, _parse_kelvin)
+
+    def read_resistance_with_status(self, input_channel: int) -> Tuple[Optional[float], Optional[int]]:
+        return self._read_with_status("RDGR?", input_channel, _parse_resistance)
 
     def get_resistance_range(self, input_channel):
         if not isinstance(input_channel, int) or input_channel < 1 or input_channel > 16:
             raise ValueError("Input channel must be an integer between 1 and 16")
 
-        response = self.send_command(f"RDGRNG? {input_channel}")
+        # Short TTL since the range can also be changed from the front panel
+        response = self._cached_query(f"RDGRNG? {input_channel}", ttl=1.0)
         if response is None or response == "":
             return "NO_RESPONSE"
         
@@ -183,6 +798,7 @@ class TemperatureReader:
         except (ValueError, IndexError):
             return response
 
+    @locked
     def set_resistance_range(self, input_channel, mode, excitation, range_code, autorange, cs_off):
         if not isinstance(input_channel, int) or input_channel < 1 or input_channel > 16:
             raise ValueError("Input channel must be an integer between 1 and 16")
@@ -212,16 +828,14 @@ class TemperatureReader:
         command = f"RDGRNG {input_channel},{mode},{excitation},{range_code},{autorange},{cs_off}"
         
         try:
-            # Clear any leftover data
-            self.ser.reset_input_buffer()
-            
             # Send command
+            self.invalidate(input_channel)
             self.ser.write((command + '\r\n').encode('ascii'))
-            time.sleep(0.5)  # Longer delay for write commands
+            self.ser.flush()
             
             print(f"Sent command: {command}")
             
-            time.sleep(0.2) 
+            time.sleep(0.2)  # Give the 370 time to apply the new range before reading it back
             new_config = self.get_resistance_range(input_channel)
             if isinstance(new_config, dict):
                 print(f"  After:  {new_config['mode']},{new_config['excitation']},{new_config['range']},{new_config['autorange']},{new_config['cs_off']}")
@@ -242,62 +856,265 @@ class TemperatureReader:
             print(f"Communication error sending RDGRNG command: {e}")
             return False
 
-    def read_sensor(self, input_channel):
-        if not isinstance(input_channel, int) or input_channel < 1 or input_channel > 16:
-            raise ValueError("Input channel must be an integer between 1 and 16")
-
-        # Read sensor value using correct 370 command
-        response = self.send_command(f"RDGS? {input_channel}")
-        if response is None or response == "":
-            return "NO_RESPONSE"
-        
-        # Handle common 370 error responses
-        response_upper = response.upper()
-        if "OVERLD" in response_upper or "OVER" in response_upper:
-            return "SENSOR_OVER"
-        if "NOT" in response_upper or "NONE" in response_upper:
-            return "NOT_CONFIGURED"
-            
-        try:
-            sensor_value = float(response)
-            return sensor_value
-        except ValueError:
-            return response
+    def read_sensor(self, input_channel: int, bypass_cache: bool = False) -> Optional[float]:
+        return self._checked(self._read("RDGS?", input_channel, _parse_sensor, bypass_cache))
 
-    def scan_inputs(self, input_list=None):
+    # Results keep the error code strings in place of None, one dict per input.
+    # With compound=True each input is read with one compound query
+    # (RDGK? n;RDGR? n;RDGS? n;RDGPWR? n;RDGST? n) instead of five round-trips,
+    # or inputs_per_line inputs per query.
+    # pipelined=True selects each input with SCAN (autoscan off) and waits settle seconds before reading it
+    @locked
+    def scan_inputs(self, input_list=None, pipelined=False, settle=3.0):
         if input_list is None:
             input_list = [1, 2, 3, 4]  # Default inputs to scan
-        
+
+        if pipelined:
+            return self._scan_inputs_pipelined(input_list, settle)
+
+        if self.compound and self.inputs_per_line > 1:
+            return self._scan_inputs_packed(input_list)
+
         results = {}
         for input_ch in input_list:
             try:
-                # Read all types of data for each input
-                temp = self.read_kelvin_temperature(input_ch)
-                resistance = self.read_resistance(input_ch)
-                sensor = self.read_sensor(input_ch)
-                power = self.read_excitation_power(input_ch)
-                status = self.read_status(input_ch)
-                
-                results[input_ch] = {
-                    'temperature': temp,
-                    'resistance': resistance,
-                    'sensor': sensor,
-                    'power': power,
-                    'status': status
-                }
+                results[input_ch] = self._scan_one(input_ch)
             except Exception as e:
-                results[input_ch] = {
-                    'temperature': f'ERROR: {e}',
-                    'resistance': f'ERROR: {e}',
-                    'sensor': f'ERROR: {e}',
-                    'power': f'ERROR: {e}',
-                    'status': f'ERROR: {e}'
-                }
+                results[input_ch] = _scan_error(e)
         return results
 
+    # Readings for one input
+    def _scan_one(self, input_ch):
+        if type(input_ch) is not int or input_ch not in _VALID_CH:
+            raise ValueError("Input channel must be an integer between 1 and 16")
+
+        fields = None
+        if self.compound:
+            fields = self.send_compound(_SCAN_COMMANDS[input_ch])
+        if fields is None:
+            # compound=False, or firmware did not answer the compound query: read one by one
+            return self._read_input_unchecked(input_ch)
+
+        return _parse_scan_fields(fields)
+
+    # inputs_per_line inputs share one compound line ("RDGK? 1;...;RDGST? 1;RDGK? 2;...").
+    # A line that comes back short is read again one input at a time
+    def _scan_inputs_packed(self, input_list):
+        results = {}
+        channels = []
+        for input_ch in input_list:
+            if type(input_ch) is int and input_ch in _VALID_CH:
+                channels.append(input_ch)
+            else:
+                results[input_ch] = _scan_error(ValueError("Input channel must be an integer between 1 and 16"))
+
+        for start in range(0, len(channels), self.inputs_per_line):
+            group = channels[start:start + self.inputs_per_line]
+            fields = self.send_compound([command for input_ch in group for command in _SCAN_COMMANDS[input_ch]])
+            for i, input_ch in enumerate(group):
+                try:
+                    if fields is None:
+                        results[input_ch] = self._scan_one(input_ch)
+                    else:
+                        results[input_ch] = _parse_scan_fields(fields[5 * i:5 * i + 5])
+                except Exception as e:
+                    results[input_ch] = _scan_error(e)
+
+        return {input_ch: results[input_ch] for input_ch in input_list}
+
+    # The SCAN for the next input goes out right behind the current input's queries,
+    # so the next channel settles while this reply is read and parsed
+    def _scan_inputs_pipelined(self, input_list, settle):
+        results = {}
+        channels = []
+        for input_ch in input_list:
+            if type(input_ch) is int and input_ch in _VALID_CH:
+                channels.append(input_ch)
+            else:
+                results[input_ch] = _scan_error(ValueError("Input channel must be an integer between 1 and 16"))
+        if not channels:
+            return results
+
+        # Put the scanner back where it was afterwards ("<channel>,<autoscan>")
+        previous = self.send_command("SCAN?")
+
+        self._send_setting(f"SCAN {channels[0]},0")
+        selected_at = time.monotonic()
+        for i, input_ch in enumerate(channels):
+            remaining = settle - (time.monotonic() - selected_at)
+            if remaining > 0:
+                time.sleep(remaining)
+
+            then = (f"SCAN {channels[i + 1]},0",) if i + 1 < len(channels) else ()
+            try:
+                fields = None
+                if self.compound:
+                    # The next input is selected when this line goes out, not when its reply is in
+                    line_sent = time.monotonic()
+                    fields = self.send_compound(_SCAN_COMMANDS[input_ch] + then)
+                if fields is not None:
+                    results[input_ch] = _parse_scan_fields(fields)
+                    selected_at = line_sent
+                else:
+                    # compound=False, or firmware did not answer the compound query: read one by one,
+                    # then select the next input
+                    results[input_ch] = self._read_input_unchecked(input_ch)
+                    for command in then:
+                        self._send_setting(command)
+                    selected_at = time.monotonic()
+            except Exception as e:
+                results[input_ch] = _scan_error(e)
+                selected_at = time.monotonic()
+
+        if previous and ',' in previous:
+            self._send_setting(f"SCAN {previous}")
+        return {input_ch: results[input_ch] for input_ch in input_list}
+
+    # scan_inputs() (same arguments) packed into a numpy structured array, one SCAN_DTYPE row per input.
+    # The error code strings are only kept by scan_inputs(); here they become NaN plus a flag bit
+    def scan_inputs_array(self, input_list=None, **scan_kwargs):
+        import numpy as np  # Only needed here, so the CLI doesn't pay for importing it
+
+        # A bad input has no 'ch' value to go in its row, so it is refused before anything is sent
+        if input_list is not None:
+            input_list = list(input_list)
+            if any(type(input_ch) is not int or input_ch not in _VALID_CH for input_ch in input_list):
+                raise ValueError("Input channel must be an integer between 1 and 16")
+
+        rows = []
+        for input_ch, data in self.scan_inputs(input_list, **scan_kwargs).items():
+            flags = 0
+            values = []
+            for field, bit in SCAN_FLAGS.items():
+                value = data[field]
+                if isinstance(value, str):
+                    flags |= bit
+                    value = 0 if field == 'status' else math.nan
+                values.append(value)
+            rows.append((input_ch, *values, flags))
+        return np.array(rows, dtype=SCAN_DTYPE)
+
+    # Like scan_inputs(), but the readings are written in place into per-reader arrays (one per
+    # SCAN_FLAGS field, slot i for input i + 1) instead of a new dict per input, and
+    # {field: memoryview} is returned. The views are the same on every call and are overwritten
+    # by the next scan; copy them (e.g. .tolist()) to keep a result, and don't write to them.
+    # Inputs not scanned and readings that came back as error codes are NaN (status -1)
+    @locked
+    def scan_inputs_soa(self, input_list=None):
+        if input_list is None:
+            input_list = [1, 2, 3, 4]  # Default inputs to scan
+
+        # A bad input has no slot to write to, so it is refused before anything is sent
+        input_list = list(input_list)
+        if any(type(input_ch) is not int or input_ch not in _VALID_CH for input_ch in input_list):
+            raise ValueError("Input channel must be an integer between 1 and 16")
+
+        columns = [self._soa[field] for field in SCAN_FLAGS]
+        for column, empty in zip(columns, _SOA_EMPTY.values()):
+            column[:] = empty
+
+        for input_ch in input_list:
+            fields = self.send_compound(_SCAN_COMMANDS[input_ch]) if self.compound else None
+            if fields is None:
+                # compound=False, or firmware did not answer the compound query: read one by one
+                values = self._read_input_unchecked(input_ch).values()
+            else:
+                values = [parse(field) for parse, field in zip(_SCAN_PARSERS, fields)]
+
+            for column, value in zip(columns, values):
+                if not isinstance(value, str):
+                    column[input_ch - 1] = value
+        return self._soa_views
+
+    # All five readings for one already validated input, one query each
+    def _read_input_unchecked(self, input_ch):
+        # Read all types of data for each input
+        temp = self._read_unchecked("RDGK?", input_ch, _parse_kelvin)
+        resistance = self._read_unchecked("RDGR?", input_ch, _parse_resistance)
+        sensor = self._read_unchecked("RDGS?", input_ch, _parse_sensor)
+        power = self._read_unchecked("RDGPWR?", input_ch, _parse_power)
+        status = self._read_unchecked("RDGST?", input_ch, _parse_status)
+        
+        return {
+            'temperature': temp,
+            'resistance': resistance,
+            'sensor': sensor,
+            'power': power,
+            'status': status
+        }
+
+    # submit(), poll() and receive() let one thread keep a command in flight on several bridges:
+    #
+    #     for reader in readers:
+    #         reader.submit("RDGK? 1")
+    #     waiting = [reader for reader in readers if not reader.poll()]
+    #     while waiting:
+    #         ready, _, _ = select.select(waiting, [], [], timeout)
+    #         if not ready:
+    #             break  # Timed out; receive() still returns (None) for the ones left
+    #         waiting = [reader for reader in waiting if reader not in ready or not reader.poll()]
+    #     replies = [reader.receive() for reader in readers]
+    #
+    # Until receive() nothing else may be sent on the port (other commands raise RuntimeError).
+    # Not for threaded=True, whose reader thread takes the bytes fileno() would signal
+    @locked
+    def submit(self, command):
+        """Write a command and return without waiting for its reply (collect it with receive())"""
+        if self._rx_queue is not None:
+            raise RuntimeError("submit() can't be used with threaded=True")
+        if self._submitted is not None:
+            raise RuntimeError("receive() the reply to the submitted command first")
+
+        data = command.encode('ascii') + _TERM
+        try:
+            self._write(data)
+        except Exception:
+            self.port_state.stale = True
+            raise
+        self._submitted = _count_queries(data)
+
+    @locked
+    def poll(self):
+        """Read whatever has arrived without waiting; True once the whole reply to submit() is in"""
+        if self._submitted is None:
+            raise RuntimeError("no command submitted")
+        self._fill_rx_now()
+        return self._replies_buffered() >= self._submitted
+
+    @locked
+    def receive(self):
+        """Reply to the command written by submit(), as send_command would return it.
+        Waits up to timeout for the parts that haven't arrived yet"""
+        expected = self._submitted
+        if expected is None:
+            raise RuntimeError("no command submitted")
+        self._submitted = None
+        if not expected:
+            return None  # Settings have no reply
+        try:
+            return self._receive_reply(expected)
+        except Exception as e:
+            self.port_state.stale = True
+            print(f"Communication error: {e}")
+            return None
+
+    def fileno(self):
+        """File descriptor of the serial port, for select()/event loops waiting on submit() replies.
+        Bytes already read into the receive buffer don't make it readable again, so call poll()
+        before waiting on it (see submit())"""
+        return self.ser.fileno()
+
     def close(self):
         """Close serial connection"""
-        if hasattr(self, 'ser') and self.ser and self.ser.is_open:
+        if getattr(self, '_reader_thread', None) is not None:
+            self._reader_thread.stop()
+            self._reader_thread = None
+        if getattr(self, '_log_thread', None) is not None:
+            self._stop_log_writer()
+        if getattr(self, '_disk_cache', None) is not None:
+            self._disk_cache.close()
+            self._disk_cache = None
+        if getattr(self, '_owns_ser', False) and getattr(self, 'ser', None) and self.ser.is_open:
             self.ser.close()
             print("Lakeshore 370 connection closed")
 